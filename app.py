@@ -3,8 +3,11 @@
 import os
 from factory import create_app, socketio
 
-# Create the Flask app instance
-app = create_app()
+# Create the Flask app instance. Spawned worker processes (e.g. the backtester's
+# grid pool) re-import the main module as "__mp_main__"; they must not rebuild
+# the app, its DB engine and SocketIO, so they skip this.
+if __name__ != "__mp_main__":
+    app = create_app()
 
 # Expose app and socketio for external use (e.g., Azure with gunicorn)
 # Azure will use: gunicorn --worker-class eventlet -w 1 app:app --bind=0.0.0.0:$PORT
@@ -1,5 +1,104 @@
 import datetime
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import ccxt  # type: ignore
+import numpy as np
+from core.cache import TTLCache
+
+# Grids smaller than this many candle-steps (cells x candles) run inline;
+# below it, worker start-up costs more than the simulation itself.
+PARALLEL_GRID_THRESHOLD = 2_000_000
+
+# Optimizer results per (symbol, exchange, timeframe, start, end, amount, sell%).
+# Bounded by TTL because an open-ended window keeps gaining candles.
+_grid_cache = TTLCache(ttl=3600, maxsize=4096)
+
+# Candle series per (exchange, symbol, timeframe, start, end), shared by
+# backtests and the optimizer so repeated runs over one window download once.
+_ohlcv_cache = TTLCache(ttl=600, maxsize=64)
+# Unauthenticated ccxt clients used for public OHLCV, one per exchange
+_public_exchanges: dict = {}
+_public_exchanges_lock = threading.Lock()
+
+# Per-process state for optimizer workers, installed by _init_grid_worker
+_grid_closes: list = []
+_grid_amount = 0.0
+
+
+def _init_grid_worker(closes, amount):
+    global _grid_closes, _grid_amount
+    _grid_closes = closes
+    _grid_amount = amount
+
+
+def _simulate_sell_target(closes, amount, sell_pct):
+    """Replay close prices buying with ``amount`` and selling at ``sell_pct`` above entry."""
+    balance = amount
+    position = 0
+    buy_price = 0
+    profit = 0
+
+    for price in closes:
+        if position == 0 and balance >= amount:
+            buy_price = price
+            position = balance / price
+            balance = 0
+
+        elif position > 0 and price >= buy_price * (1 + sell_pct / 100):
+            proceeds = position * price
+            profit += proceeds - amount
+            balance = proceeds
+            position = 0
+
+    return profit
+
+
+def _eval_grid_cell(sell_pct):
+    return _simulate_sell_target(_grid_closes, _grid_amount, sell_pct)
+
+
+def _public_exchange(exchange_name):
+    with _public_exchanges_lock:
+        exchange = _public_exchanges.get(exchange_name)
+        if exchange is None:
+            exchange_class = getattr(ccxt, exchange_name)
+            exchange = exchange_class({
+                'enableRateLimit': True,
+            })
+            _public_exchanges[exchange_name] = exchange
+        return exchange
+
+
+def _fetch_ohlcv(exchange_name, symbol, timeframe, start_date=None, end_date=None):
+    """Return candles for ``symbol`` between the given dates, cached for repeat runs.
+
+    Fetch errors propagate and are not cached. The returned list is shared
+    between callers and must not be modified.
+    """
+    key = (exchange_name, symbol, timeframe, start_date, end_date)
+    ohlcv = _ohlcv_cache.get(key)
+    if ohlcv is not None:
+        return ohlcv
+
+    exchange = _public_exchange(exchange_name)
+
+    # Convert provided dates to timestamps
+    since = None
+    until = None
+    if start_date:
+        since = exchange.parse8601(f"{start_date}T00:00:00Z")
+    if end_date:
+        until = exchange.parse8601(f"{end_date}T00:00:00Z")
+    if since is None:
+        since = exchange.parse8601('2023-01-01T00:00:00Z')
+
+    ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since)
+    if until is not None:
+        ohlcv = [c for c in ohlcv if c[0] <= until]
+    _ohlcv_cache.set(key, ohlcv)
+    return ohlcv
 
 def run_backtest(pairs, start_date=None, end_date=None):
     """Run a simple backtest for the provided trading pairs."""
@@ -15,25 +114,8 @@ def run_backtest(pairs, start_date=None, end_date=None):
         timeframe = pair.get('timeframe', '1d')  # Default to 1d if not specified
         print(f"[SIM] Running backtest for {symbol} on {exchange_name}...")
 
-        exchange_class = getattr(ccxt, exchange_name)
-        exchange = exchange_class({
-            'enableRateLimit': True,
-        })
-
-        # Convert provided dates to timestamps
-        since = None
-        until = None
-        if start_date:
-            since = exchange.parse8601(f"{start_date}T00:00:00Z")
-        if end_date:
-            until = exchange.parse8601(f"{end_date}T00:00:00Z")
-        if since is None:
-            since = exchange.parse8601('2023-01-01T00:00:00Z')
-
         try:
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since)
-            if until is not None:
-                ohlcv = [c for c in ohlcv if c[0] <= until]
+            ohlcv = _fetch_ohlcv(exchange_name, symbol, timeframe, start_date, end_date)
         except Exception as e:
             print(f"  [ERROR] Could not fetch OHLCV data for {symbol} on {exchange_name}: {e}")
             continue
@@ -76,64 +158,81 @@ def run_backtest(pairs, start_date=None, end_date=None):
     print("[BACKTEST] Complete.")
     return results
 
-def optimize_strategy(pair, buy_range, sell_range, start_date=None, end_date=None):
-    symbol = pair['symbol']
-    exchange_name = pair['exchange']
-    amount = pair['amount']
-    timeframe = pair.get('timeframe', '1d')
-
-    print(f"[OPTIMIZER] Testing {symbol} on {exchange_name}...")
+def param_grid(buy_values, sell_values, dtype=np.float64):
+    """Return every (buy%, sell%) pair as a contiguous ``(n, 2)`` array, buy-major."""
+    buys = np.asarray(buy_values, dtype=dtype)
+    sells = np.asarray(sell_values, dtype=dtype)
+    bg, sg = np.meshgrid(buys, sells, indexing='ij')
+    return np.ascontiguousarray(np.stack([bg.ravel(), sg.ravel()], axis=1))
 
-    exchange_class = getattr(ccxt, exchange_name)
-    exchange = exchange_class({
-        'enableRateLimit': True,
-    })
 
-    since = None
-    until = None
-    if start_date:
-        since = exchange.parse8601(f"{start_date}T00:00:00Z")
-    if end_date:
-        until = exchange.parse8601(f"{end_date}T00:00:00Z")
-    if since is None:
-        since = exchange.parse8601('2023-01-01T00:00:00Z')
+def optimize_strategy(pair, buy_range, sell_range, start_date=None, end_date=None, max_workers=None):
+    """Grid-search ``buy_range`` x ``sell_range``; see :func:`optimize_strategy_vec`."""
+    return optimize_strategy_vec(pair, param_grid(buy_range, sell_range), start_date, end_date, max_workers)
 
-    try:
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since)
-        if until is not None:
-            ohlcv = [c for c in ohlcv if c[0] <= until]
-    except Exception as e:
-        print(f"  [ERROR] Failed to fetch data for optimizer: {e}")
-        return
 
-    best_combo = None
-    best_profit = -float('inf')
+def optimize_strategy_vec(pair, combos, start_date=None, end_date=None, max_workers=None):
+    """Return the best ``(buy%, sell%)`` row of ``combos`` for ``pair``, or ``None`` without data.
 
-    for buy_pct in buy_range:
-        for sell_pct in sell_range:
-            balance = amount
-            position = 0
-            buy_price = 0
-            profit = 0
-
-            for candle in ohlcv:
-                _, _, _, _, close_price, _ = candle
-                price = close_price
-
-                if position == 0 and balance >= amount:
-                    buy_price = price
-                    position = balance / price
-                    balance = 0
-
-                elif position > 0 and price >= buy_price * (1 + sell_pct / 100):
-                    proceeds = position * price
-                    profit += proceeds - amount
-                    balance = proceeds
-                    position = 0
+    ``combos`` is an ``(n, 2)`` array such as :func:`param_grid` builds. Ties
+    resolve to the earliest row.
+    """
+    symbol = pair['symbol']
+    exchange_name = pair['exchange']
+    amount = pair['amount']
+    timeframe = pair.get('timeframe', '1d')
 
-            if profit > best_profit:
-                best_profit = profit
-                best_combo = (buy_pct, sell_pct)
+    print(f"[OPTIMIZER] Testing {symbol} on {exchange_name}...")
 
-    print(f"[OPTIMIZER RESULT] {symbol} best combo: Buy {best_combo[0]}%, Sell {best_combo[1]}% -> Profit {best_profit:.2f} USDC")  # type: ignore
+    combos = np.asarray(combos)
+    if combos.size == 0:
+        return None
+
+    # buy_pct does not enter the simulation, so cells sharing a sell target
+    # share a result; evaluate each distinct target once and reuse cached runs.
+    sell_targets, sell_index = np.unique(combos[:, 1], return_inverse=True)
+    cache_key = (symbol, exchange_name, timeframe, start_date, end_date, amount)
+    profit_by_sell = np.empty(len(sell_targets))
+    missing = []
+    for i, sell_pct in enumerate(sell_targets.tolist()):
+        cached = _grid_cache.get(cache_key + (sell_pct,))
+        if cached is None:
+            missing.append((i, sell_pct))
+        else:
+            profit_by_sell[i] = cached
+
+    if missing:
+        try:
+            ohlcv = _fetch_ohlcv(exchange_name, symbol, timeframe, start_date, end_date)
+        except Exception as e:
+            print(f"  [ERROR] Failed to fetch data for optimizer: {e}")
+            return
+
+        closes = [candle[4] for candle in ohlcv]
+        missing_sells = [sell_pct for _, sell_pct in missing]
+
+        workers = min(max_workers or os.cpu_count() or 1, len(missing))
+        if workers > 1 and len(missing) * len(closes) >= PARALLEL_GRID_THRESHOLD:
+            # Spawned (not forked) workers: the web process runs eventlet and threads
+            chunksize = max(1, len(missing) // (workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_grid_worker,
+                initargs=(closes, amount),
+            ) as pool:
+                profits = list(pool.map(_eval_grid_cell, missing_sells, chunksize=chunksize))
+        else:
+            profits = [_simulate_sell_target(closes, amount, sell_pct) for sell_pct in missing_sells]
+
+        for (i, sell_pct), profit in zip(missing, profits):
+            profit_by_sell[i] = profit
+            _grid_cache.set(cache_key + (sell_pct,), profit)
+
+    cell_profits = profit_by_sell[sell_index.ravel()]
+    best = int(np.argmax(cell_profits))
+    best_combo = (combos[best, 0].item(), combos[best, 1].item())
+    best_profit = cell_profits[best].item()
+
+    print(f"[OPTIMIZER RESULT] {symbol} best combo: Buy {best_combo[0]}%, Sell {best_combo[1]}% -> Profit {best_profit:.2f} USDC")
     return best_combo
@@ -0,0 +1,53 @@
+# core/cache.py
+
+import threading
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Small thread-safe mapping whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, ttl: float, maxsize: int = 128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict(now)
+            self._data[key] = (now + self.ttl, value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self, now: float):
+        # Drop expired entries first; if still full, drop the oldest insert.
+        for key in [k for k, (expires, _) in self._data.items() if expires <= now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+
+    def __len__(self):
+        return len(self._data)
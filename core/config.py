@@ -1,19 +1,30 @@
 # core/config.py
 
+import functools
 import os
 import yaml
 
+@functools.lru_cache(maxsize=8)
+def _read_yaml(path):
+    """Parse ``path`` once; failures raise and so are never cached."""
+    with open(path, "r") as file:
+        return yaml.safe_load(file) or {}
+
+def invalidate_config_cache():
+    """Forget parsed config files; call after writing settings.yaml/config.yaml."""
+    _read_yaml.cache_clear()
+
 def load_config(path="config.yaml"):
     if path == "config.yaml" and os.path.exists("settings.yaml"):
         path = "settings.yaml"
 
     try:
-        with open(path, "r") as file:
-            config = yaml.safe_load(file) or {}
+        # Shallow copy so the keys added below never touch the cached parse
+        config = dict(_read_yaml(path))
     except Exception as e:
         print(f"Failed to load config: {e}")
         return {}
-    
+
     db = config.get("database", {})
     if db.get("engine") == "sqlite":
         config["SQLALCHEMY_DATABASE_URI"] = db.get(
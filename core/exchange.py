@@ -4,12 +4,53 @@ import os
 import logging
 import time
 import re
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from decimal import Decimal, ROUND_DOWN, InvalidOperation
 
 logger = logging.getLogger(__name__)
 
 MIN_NOTIONAL = 6.0
 
+class _SharedSession(requests.Session):
+    """Session that outlives the ccxt clients borrowing it.
+
+    ``ccxt.Exchange.__del__`` closes whatever session it was given, which
+    would tear down the pool for every other connector; closing is a no-op.
+    """
+
+    def close(self) -> None:
+        pass
+
+
+_shared_session: requests.Session | None = None
+_shared_session_lock = threading.Lock()
+
+
+def shared_http_session() -> requests.Session:
+    """Return a process-wide pooled HTTP session for ccxt clients.
+
+    Passing it as ``params['session']`` lets connectors reuse open TCP/TLS
+    connections instead of each client keeping its own small pool. Only
+    idempotent requests are retried, so orders are never resent.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = _SharedSession()
+            adapter = HTTPAdapter(
+                pool_connections=32,
+                pool_maxsize=32,
+                # Only GETs are retried; the default also resends PUT/DELETE
+                max_retries=Retry(total=3, backoff_factor=0.2, allowed_methods=frozenset({"GET"})),
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _shared_session = session
+        return _shared_session
+
 
 class ExchangeConnector:
     def __init__(self, exchange_id: str, params: dict | None = None):
@@ -4,6 +4,7 @@ from flask_socketio import SocketIO
 
 # This will be initialized by the main app/factory
 sio_instance: SocketIO = None
+# Fixed-size ring of ready-to-emit payloads; old entries fall off the left.
 strategy_log_buffer = collections.deque(maxlen=50)
 
 def initialize_socketio_for_logging(sio: SocketIO):
@@ -23,10 +24,10 @@ class StrategyLogHandler(logging.Handler):
         # but that might be tricky with how loggers are configured early.
         # This means initialize_socketio_for_logging MUST be called before logs are emitted.
         if sio_instance:
-            log_entry = self.format(record) # Use the handler's or logger's formatter
-            strategy_log_buffer.append(log_entry)
+            payload = {'data': self.format(record)} # Use the handler's or logger's formatter
+            strategy_log_buffer.append(payload)
             try:
-                sio_instance.emit('live_strategy_log', {'data': log_entry})
+                sio_instance.emit('live_strategy_log', payload)
             except Exception as e:
                 # Handle cases where emit might fail (e.g., during shutdown, tests without proper sio mock)
                 # Using a simple print for now, a more robust app might log to a fallback or stderr.
@@ -36,5 +37,6 @@ class StrategyLogHandler(logging.Handler):
             print(f"Socket.IO not initialized for StrategyLogHandler, log: {self.format(record)}")
 
 # Function to get current buffered logs (e.g., for new client connections)
-def get_buffered_strategy_logs() -> list[str]:
-    return list(strategy_log_buffer)
+def get_buffered_strategy_logs() -> tuple[dict, ...]:
+    # Snapshot of the emitted payloads, so replaying them needs no reformatting
+    return tuple(strategy_log_buffer)
@@ -3,7 +3,7 @@ from datetime import datetime
 
 class ProfitLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     symbol = db.Column(db.String(20), nullable=False)
     buy_price = db.Column(db.Float, nullable=False)
     sell_price = db.Column(db.Float, nullable=False)
@@ -50,8 +50,8 @@ class TradingPair(db.Model):
     amount = db.Column(db.Float, nullable=False)
     buy_percentage = db.Column(db.Float, nullable=False)
     sell_percentage = db.Column(db.Float, nullable=False)
-    trading_mode = db.Column(db.String(10), default='testnet')
-    profit_mode = db.Column(db.String(10), nullable=False, default='usdc')
+    trading_mode = db.Column(db.String(10), default='testnet', server_default='testnet')
+    profit_mode = db.Column(db.String(10), nullable=False, default='usdc', server_default='usdc')
 
     __table_args__ = (
         db.UniqueConstraint('symbol', 'exchange', name='uix_symbol_exchange'),
@@ -61,6 +61,9 @@ class OrderManager:
             db.session.commit()
 
     def print_orders(self):
+        # Skip the query entirely when nothing would be logged
+        if not logger.isEnabledFor(logging.INFO):
+            return
         orders = Order.query.all()
         for o in orders:
             logger.info(
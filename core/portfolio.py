@@ -96,6 +96,8 @@ class PortfolioManager:
         # that logic separately. For the current strategy, this is sufficient.
 
     def print_status(self):
+        if not logger.isEnabledFor(logging.INFO):
+            return
         if not self.positions:
             logger.info("No active positions.")
             return
@@ -5,8 +5,8 @@ from flask_login import login_required, current_user
 
 from modules.auth import login, logout
 from modules.bot_control import bot_manager, control_bot, profit_tracker
-from modules.data import get_data, get_profit_data, get_trade_data # Removed get_account_balances
-from modules.notifications import get_notifications, clear_notifications
+from modules.data import get_data, get_profit_data, get_trade_data, invalidate_pnl_cache # Removed get_account_balances
+from modules.notifications import get_notifications, clear_notifications, notifications_response
 from modules.settings import (
     api_add_pair,
     api_change_password,
@@ -18,7 +18,7 @@ from modules.settings import (
     set_base_currency,
     update_pair_config,
 )
-from modules.backtest import backtest, optimize
+from modules.backtest import backtest, optimize, task_status
 import logging
 from concurrent.futures import ThreadPoolExecutor  # Added import
 import io
@@ -157,10 +157,11 @@ def register_routes(app):
         base_currency = session["base_currency"]
 
         all_pairs_data = get_pairs()
+        running = bot_manager.running_ids()
         pairs_with_status = []
         for pair in all_pairs_data:
             pair_copy = pair.copy()
-            pair_copy['is_running'] = bot_manager.is_running(pair['id'])
+            pair_copy['is_running'] = pair['id'] in running
             pairs_with_status.append(pair_copy)
 
         # Account information will be fetched asynchronously via /api/data
@@ -192,11 +193,12 @@ def register_routes(app):
         notification_list = [
             {
                 "symbol": symbol,
-                "message": msg["message"],
-                "type": msg["type"],
-                "timestamp": msg["timestamp"],
+                "message": msg.message,
+                "type": msg.type,
+                "timestamp": msg.timestamp,
             }
-            for symbol, messages in notifications.items()
+            # Snapshot the items: bots may add symbols while this runs
+            for symbol, messages in list(notifications.items())
             for msg in messages
         ]
         notification_list.sort(key=lambda x: x["timestamp"], reverse=True)
@@ -212,6 +214,11 @@ def register_routes(app):
     def optimize_route():
         return optimize()
 
+    @app.route("/tasks/<task_id>")
+    @login_required
+    def task_status_route(task_id):
+        return task_status(task_id)
+
     @app.route("/settings", methods=["GET", "POST"])
     @login_required
     def settings_route():
@@ -326,7 +333,7 @@ def register_routes(app):
     @app.route("/api/notifications")
     @login_required
     def get_notifications_route():
-        return jsonify(get_notifications())
+        return notifications_response()
 
     @app.route("/clear_notifications", methods=["POST"])
     @login_required
@@ -389,8 +396,9 @@ def register_routes(app):
     def get_bot_statuses():
         statuses = {}
         pairs = get_pairs()  # Assuming get_pairs() returns a list of dicts with 'id'
+        running = bot_manager.running_ids()
         for pair in pairs:
-            statuses[pair['id']] = bot_manager.is_running(pair['id'])
+            statuses[pair['id']] = pair['id'] in running
         return jsonify(statuses)
 
     @app.route("/api/profit_log_entries")
@@ -466,6 +474,7 @@ def register_routes(app):
         try:
             success = profit_tracker.reset_profit(int(pair_id))
             if success:
+                invalidate_pnl_cache()
                 return jsonify({"status": "success"})
             return jsonify({"status": "not_found"}), 404
         except Exception as e:
@@ -482,6 +491,7 @@ def register_routes(app):
         try:
             success = profit_tracker.remove_pair_profit(int(pair_id))
             if success:
+                invalidate_pnl_cache()
                 return jsonify({"status": "success"})
             return jsonify({"status": "not_found"}), 404
         except Exception as e:
@@ -4,14 +4,17 @@ import time
 import logging
 from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, session, render_template, jsonify, request, current_app
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_socketio import SocketIO
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 from dotenv import load_dotenv
 from core.extensions import db, migrate
 from core.config import load_config
+from core.cache import TTLCache
 from modules.auth import load_user
 from modules.utils import get_price, get_pairs
+from modules.key_loader import refresh_env
 # Import get_buffered_strategy_logs globally
 from core.logging_handlers import get_buffered_strategy_logs
 
@@ -20,17 +23,38 @@ login_manager = LoginManager()
 bcrypt = Bcrypt()
 
 connected_clients = set()
+_client_lock = threading.Lock()
+# Set while a price streamer should be running; the generation counter lets a
+# streamer that outlived a disconnect/reconnect cycle notice it was replaced.
+_streaming = threading.Event()
+_stream_generation = 0
+
+# Shared pool for the blocking ccxt price fetches. Kept for the lifetime of
+# the process so ticks don't pay for spinning threads up and joining them.
+_price_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="price")
+# Short-lived cache so pairs sharing an (exchange, symbol, mode) hit the API once.
+_price_cache = TTLCache(ttl=2, maxsize=512)
 
 def create_app():
     load_dotenv()
+    refresh_env()  # Pick up variables loaded from .env in the credential lookups
     logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s - %(message)s')
 
-    # Suppress Werkzeug's standard INFO logs (HTTP requests)
+    # Suppress Werkzeug's standard INFO logs (HTTP requests). The level check
+    # rejects them before a LogRecord is built; the NullHandler stops werkzeug
+    # from attaching its own stderr handler. Errors still propagate to root.
     werkzeug_logger = logging.getLogger('werkzeug')
     werkzeug_logger.setLevel(logging.ERROR)
+    if not werkzeug_logger.handlers:
+        werkzeug_logger.addHandler(logging.NullHandler())
 
     app = Flask(__name__)
     app.secret_key = os.getenv('FLASK_SECRET_KEY', 'default_secret_key')
+    # Behind the reverse proxy remote_addr is the proxy itself; take the client
+    # from X-Forwarded-For. Set TRUSTED_PROXY_HOPS=0 when serving directly.
+    proxy_hops = int(os.getenv('TRUSTED_PROXY_HOPS', '1'))
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops)
 
     config = load_config()
     app.config.update(config)
@@ -70,9 +94,9 @@ def create_app():
 @socketio.on('request_initial_strategy_logs')
 def handle_request_initial_strategy_logs():
     """Sends the current buffer of strategy logs to the requesting client."""
-    logs = get_buffered_strategy_logs()
-    for log_entry in logs:
-        socketio.emit('live_strategy_log', {'data': log_entry}, room=request.sid)
+    sid = request.sid
+    for payload in get_buffered_strategy_logs():
+        socketio.emit('live_strategy_log', payload, room=sid)
 
 @login_manager.user_loader
 def user_loader(username):
@@ -81,51 +105,61 @@ def user_loader(username):
 PRICE_UPDATE_INTERVAL = 3  # seconds
 PAIR_REFRESH_INTERVAL = 60  # seconds
 
-def stream_prices(app):
+def stream_prices(app, generation=0):
     """Background task that emits price updates to connected clients."""
     from modules.utils import get_price  # Local import keeps startup fast
     from modules.bot_control import bot_manager
 
-    # Initial pair load requires an application context
+    # One application context for the lifetime of the task; the DB is only
+    # touched when the pair list is (re)loaded.
     with app.app_context():
         pairs = get_pairs()
-
-    last_refresh = time.time()
-
-    while connected_clients:
-        with app.app_context():
+        db.session.remove()
+        last_refresh = time.time()
+
+        def fetch(key):
+            current_exchange_name, symbol, mode = key
+            price_to_set = _price_cache.get(key)
+            if price_to_set is not None:
+                return key, price_to_set
+            price_to_set = "N/A"
+            try:
+                price_to_set = get_price(current_exchange_name, symbol, mode)
+                _price_cache.set(key, price_to_set)
+            except ValueError as e:
+                app.logger.warning(
+                    f"ValueError fetching price for {symbol} on {current_exchange_name} ({mode}): {str(e)}")
+            except Exception as e:
+                app.logger.error(
+                    f"Unexpected error fetching price for {symbol} on {current_exchange_name} ({mode}): {str(e)}",
+                    exc_info=True)
+            return key, price_to_set
+
+        while _streaming.is_set() and generation == _stream_generation:
             # Refresh trading pairs periodically to catch changes from settings
             if time.time() - last_refresh > PAIR_REFRESH_INTERVAL:
                 pairs = get_pairs()
+                # Release the session so the next refresh sees fresh rows
+                db.session.remove()
                 last_refresh = time.time()
 
             prices: dict[str, float | str] = {}
             status: dict[str, bool] = {}
 
-            def fetch(pair):
-                symbol = pair['symbol']
+            # Collapse pairs that share an exchange/symbol/mode into one fetch
+            keys = []
+            for pair in pairs:
                 mode = pair.get('trading_mode', 'testnet')
-                price_to_set = "N/A"
-                current_exchange_name = pair['exchange']
-                try:
-                    if current_exchange_name.lower() != "binance" and mode == "testnet":
-                        mode = "real"
-                    price_to_set = get_price(current_exchange_name, symbol, mode)
-                except ValueError as e:
-                    app.logger.warning(
-                        f"ValueError fetching price for {symbol} on {current_exchange_name} ({mode}): {str(e)}")
-                except Exception as e:
-                    app.logger.error(
-                        f"Unexpected error fetching price for {symbol} on {current_exchange_name} ({mode}): {str(e)}",
-                        exc_info=True)
-
-                running = bot_manager.is_running(pair['id'])
-                return symbol, price_to_set, running
-
-            with ThreadPoolExecutor(max_workers=min(10, len(pairs) or 1)) as exc:
-                for symbol, price, running in exc.map(fetch, pairs):
-                    prices[symbol] = price
-                    status[symbol] = running
+                if pair['exchange'].lower() != "binance" and mode == "testnet":
+                    mode = "real"
+                keys.append((pair['exchange'], pair['symbol'], mode))
+
+            fetched = dict(_price_executor.map(fetch, set(keys)))
+            running = bot_manager.running_ids()
+            for pair, key in zip(pairs, keys):
+                symbol = pair['symbol']
+                prices[symbol] = fetched[key]
+                status[symbol] = pair['id'] in running
 
             socketio.emit(
                 'price_update',
@@ -133,18 +167,29 @@ def stream_prices(app):
                 namespace='/'
             )
 
-        time.sleep(PRICE_UPDATE_INTERVAL)
+            socketio.sleep(PRICE_UPDATE_INTERVAL)
 
 @socketio.on('connect')
 def handle_connect(auth=None):
     from flask_login import current_user # Keep local as it's specific to this function
 
-    if current_user.is_authenticated and current_user.id not in connected_clients:
-        connected_clients.add(current_user.id)
-        if len(connected_clients) == 1:
-            app = current_app._get_current_object()
-            threading.Thread(target=stream_prices, args=(app,), daemon=True).start()
-    else:
+    global _stream_generation
+
+    start = False
+    with _client_lock:
+        accepted = current_user.is_authenticated and current_user.id not in connected_clients
+        if accepted:
+            connected_clients.add(current_user.id)
+            if not _streaming.is_set():
+                _streaming.set()
+                _stream_generation += 1
+                start = True
+                generation = _stream_generation
+
+    if start:
+        app = current_app._get_current_object()
+        socketio.start_background_task(stream_prices, app, generation)
+    elif not accepted:
         msg = "unauthenticated user" if not current_user.is_authenticated else "duplicate connection"
         logging.info("Socket connection ignored: %s", msg)
 
@@ -152,4 +197,7 @@ def handle_connect(auth=None):
 def handle_disconnect():
     from flask_login import current_user # Keep local
     if current_user.is_authenticated:
-        connected_clients.discard(current_user.id)
+        with _client_lock:
+            connected_clients.discard(current_user.id)
+            if not connected_clients:
+                _streaming.clear()
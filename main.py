@@ -1,4 +1,3 @@
-import time
 import logging
 from datetime import datetime
 from core.config import load_config
@@ -9,6 +8,7 @@ from core.order import OrderManager
 from core.tradelog import TradeLogger
 from core.profit_tracker import ProfitTracker
 from modules.notifications import add_notification
+from modules.data import invalidate_pnl_cache
 
 logger = logging.getLogger(__name__)
 from core.backtester import run_backtest
@@ -54,7 +54,9 @@ def trade_loop(
 
     while bot_manager.is_running(pair_id):
         try:
-            time.sleep(5)
+            # Returns early when the bot is stopped instead of sleeping it out
+            if bot_manager.wait_for_stop(pair_id, 5):
+                break
 
             # Check status of sell orders
             for sell_order in sell_orders[:]:  # Iterate over a copy
@@ -65,7 +67,7 @@ def trade_loop(
                     retained_qty = sell_order.get('retained_qty', 0.0)
 
                     logger.info(
-                        f"Sold {qty} at {price} — Retained {retained_qty} (Mode: {profit_mode})"
+                        "Sold %s at %s — Retained %s (Mode: %s)", qty, price, retained_qty, profit_mode
                     )
 
                     # Record the sell
@@ -80,6 +82,7 @@ def trade_loop(
                         retained_qty=retained_qty,
                         profit_mode=profit_mode,
                     )
+                    invalidate_pnl_cache()
                     trade_logger.log(
                         symbol,
                         'sell',
@@ -95,11 +98,11 @@ def trade_loop(
 
                     # If a buy order is active, cancel it
                     if buy_order_id:
-                        logger.info(f"Attempting to cancel buy order {buy_order_id} after sell.")
+                        logger.info("Attempting to cancel buy order %s after sell.", buy_order_id)
                         exchange.cancel_order(buy_order_id, symbol)
                         order_mgr.cancel_orders(symbol, side='buy')
                         buy_order_id = None
-                        logger.info(f"Canceled buy order after sell.")
+                        logger.info("Canceled buy order after sell.")
 
                     if sell_orders:
                         # More sells remain -> place next buy 1% below this sell price
@@ -117,12 +120,12 @@ def trade_loop(
                                 exchange=settings['exchange'],
                             )
                             logger.info(
-                                f"Placed new buy order {buy_order_id} at {new_buy_price}."
+                                "Placed new buy order %s at %s.", buy_order_id, new_buy_price
                             )
                     else:
                         # Last sell filled -> wait for cycle restart at loop end
                         logger.info(
-                            f"All sell orders filled for {symbol}. Preparing to restart cycle."
+                            "All sell orders filled for %s. Preparing to restart cycle.", symbol
                         )
 
                 elif status['status'] in ('canceled', 'not_found'):
@@ -137,7 +140,7 @@ def trade_loop(
                     buy_price = order_mgr.get_order(symbol, 'buy').price
                     qty = status.get('filled', order_mgr.get_order(symbol, 'buy').amount)
 
-                    logger.info(f"Buy order {buy_order_id} for {qty} {symbol} at {buy_price} filled.")
+                    logger.info("Buy order %s for %s %s at %s filled.", buy_order_id, qty, symbol, buy_price)
 
                     portfolio.record_buy(symbol, usdc_amount, buy_price)
                     trade_logger.log(
@@ -167,7 +170,10 @@ def trade_loop(
                         sell_order_id = sell_order['order_id']
                         sell_orders.append({'id': sell_order_id, 'price': sell_price, 'amount': sell_qty, 'buy_price': buy_price, 'retained_qty': retained_qty})
                         order_mgr.set_order(symbol, 'sell', sell_price, sell_qty, sell_order_id, exchange=settings['exchange'])
-                        logger.info(f"Placed new sell order {sell_order_id} for {sell_qty} at {sell_price}. Retained {retained_qty} (Mode: {profit_mode})")
+                        logger.info(
+                            "Placed new sell order %s for %s at %s. Retained %s (Mode: %s)",
+                            sell_order_id, sell_qty, sell_price, retained_qty, profit_mode,
+                        )
 
                     # Place the next buy order
                     next_buy_price = buy_price * (1 - buy_pct / 100)
@@ -176,7 +182,7 @@ def trade_loop(
                     if new_buy_order and 'order_id' in new_buy_order:
                         buy_order_id = new_buy_order['order_id']
                         order_mgr.set_order(symbol, 'buy', next_buy_price, next_buy_qty, buy_order_id, exchange=settings['exchange'])
-                        logger.info(f"Placed next buy order {buy_order_id} at {next_buy_price}.")
+                        logger.info("Placed next buy order %s at %s.", buy_order_id, next_buy_price)
                     else:
                         buy_order_id = None # Ensure buy_order_id is cleared if order fails
 
@@ -186,7 +192,7 @@ def trade_loop(
 
             # Initial start of the bot or restart after all sells are filled
             if not buy_order_id and not sell_orders:
-                logger.info(f"Starting new cycle for {symbol}.")
+                logger.info("Starting new cycle for %s.", symbol)
 
                 # Ensure any leftover orders are cleared before starting a new cycle
                 cancel_all_orders()
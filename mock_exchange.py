@@ -1,19 +1,58 @@
 import uuid
 import time
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
 
 # Mock database for orders and balances
 MOCK_ORDERS = {}
-MOCK_BALANCES = {
+MOCK_BALANCES = defaultdict(float, {
     "USDC": 1000.0
-} # Initial USDC balance
+}) # Initial USDC balance
 MOCK_TRADE_HISTORY = []
+# Guards balance read-modify-writes; strategies for different pairs may call in
+# from worker threads (StrategyManager.start_all) and share the quote currency
+_BALANCES_LOCK = threading.Lock()
 
 strategy_logger = None # Will be set by strategy_manager
 
+# Called with an "order_filled" event dict for every simulated fill, so
+# subscribers (StrategyManager) see the same fill the balances were updated with
+_FILL_CALLBACKS = []
+
+# Fixed market-buy prices per pair; anything else trades at 1 TOKEN = 10 USDC
+_DEFAULT_PRICES = {"ETH/USDC": 2000.0, "BTC/USDC": 30000.0}
+_FALLBACK_PRICE = 10.0
+
+# Memoized "BASE/QUOTE" -> ("BASE", "QUOTE") splits; the symbol set is small
+_SYMBOL_SPLIT: dict[str, tuple[str, str]] = {}
+
+def _split(pair_symbol):
+    parts = _SYMBOL_SPLIT.get(pair_symbol)
+    if parts is None:
+        parts = _SYMBOL_SPLIT[pair_symbol] = tuple(pair_symbol.split('/'))
+    return parts
+
 def set_logger(logger):
     global strategy_logger
     strategy_logger = logger
 
+def add_fill_callback(callback):
+    if callback not in _FILL_CALLBACKS:
+        _FILL_CALLBACKS.append(callback)
+
+def remove_fill_callback(callback):
+    if callback in _FILL_CALLBACKS:
+        _FILL_CALLBACKS.remove(callback)
+
+def _emit_fill(order):
+    event = {
+        "event_type": "order_filled", "pair_symbol": order.pair_symbol, "order_id": order.order_id,
+        "side": order.side, "filled_price": order.filled_price, "filled_amount_token": order.filled_amount,
+    }
+    for callback in list(_FILL_CALLBACKS):
+        callback(event)
+
 class MockOrder:
     def __init__(self, order_id, pair_symbol, order_type, side, amount, price=None, status="open"):
         self.order_id = order_id
@@ -27,29 +66,37 @@ class MockOrder:
         self.created_at = time.time()
         self.filled_price = None # Average price at which the order was filled
 
+@dataclass(frozen=True, slots=True)
+class OrderStatus:
+    """Snapshot of an order as returned by get_order_status."""
+    order_id: str
+    status: str # "open", "filled", "cancelled" or "not_found"
+    side: str | None = None
+    filled_price: float | None = None
+    filled_amount: float = 0 # Token amount bought or sold
+    price: float | None = None
+    amount: float | None = None # Tokens for a sell, USDC for a buy
+
 def market_buy(pair_symbol, usdc_amount):
     if not strategy_logger:
         print("Logger not set for mock_exchange") # Fallback
         # Or raise an exception: raise Exception("Logger not set for mock_exchange")
 
-    base_currency, quote_currency = pair_symbol.split('/')
-    if MOCK_BALANCES.get(quote_currency, 0) < usdc_amount:
-        strategy_logger.error(f"MockExchange: Insufficient {quote_currency} balance for market buy.")
-        return None, 0, 0 # Order ID, Price, Amount
+    base_currency, quote_currency = _split(pair_symbol)
 
     # Simulate a price - e.g., a fixed price or a slightly varying one
     # For simplicity, let's use a fixed price for now, e.g., 1 token = 10 USDC
     # More realistically, this would fluctuate.
-    simulated_price = 10.0 # Example: 1 TOKEN = 10 USDC for a TOKEN/USDC pair
-    if pair_symbol == "ETH/USDC":
-        simulated_price = 2000.0
-    elif pair_symbol == "BTC/USDC":
-        simulated_price = 30000.0
+    simulated_price = _DEFAULT_PRICES.get(pair_symbol, _FALLBACK_PRICE)
 
     token_amount_received = usdc_amount / simulated_price
 
-    MOCK_BALANCES[quote_currency] -= usdc_amount
-    MOCK_BALANCES[base_currency] = MOCK_BALANCES.get(base_currency, 0) + token_amount_received
+    with _BALANCES_LOCK:
+        if MOCK_BALANCES.get(quote_currency, 0) < usdc_amount:
+            strategy_logger.error(f"MockExchange: Insufficient {quote_currency} balance for market buy.")
+            return None, 0, 0 # Order ID, Price, Amount
+        MOCK_BALANCES[quote_currency] -= usdc_amount
+        MOCK_BALANCES[base_currency] += token_amount_received
 
     order_id = str(uuid.uuid4())
     MOCK_TRADE_HISTORY.append({
@@ -98,20 +145,62 @@ def cancel_order(order_id):
         strategy_logger.error(f"MockExchange: Order {order_id} not found for cancellation.")
         return False
 
+def batch(ops):
+    """
+    Executes several order operations as one request, in list order.
+    Each op is a dict with "op" ("cancel", "limit_sell" or "limit_buy") and
+    its arguments: "id" for cancel; "symbol", "qty" (tokens for a sell, USDC
+    for a buy) and "price" for limits. An op may name "requires": <index of an
+    earlier op>; it is skipped (result None) unless that op succeeded.
+    Returns one result per op: True/False for cancels, an order ID or None
+    for limits.
+    """
+    results = []
+    for op in ops:
+        required = op.get("requires")
+        if required is not None and not results[required]:
+            results.append(None)
+            continue
+        kind = op["op"]
+        if kind == "cancel":
+            results.append(cancel_order(op["id"]))
+        elif kind == "limit_sell":
+            results.append(limit_sell(op["symbol"], op["qty"], op["price"]))
+        elif kind == "limit_buy":
+            results.append(limit_buy(op["symbol"], op["qty"], op["price"]))
+        else:
+            strategy_logger.error(f"MockExchange: Unknown batch op {kind!r}.")
+            results.append(None)
+    return results
+
 def get_order_status(order_id):
-    if order_id in MOCK_ORDERS:
-        return MOCK_ORDERS[order_id].status, MOCK_ORDERS[order_id].filled_price, MOCK_ORDERS[order_id].filled_amount, MOCK_ORDERS[order_id].side, MOCK_ORDERS[order_id].price, MOCK_ORDERS[order_id].amount
-    return "not_found", None, 0, None, None, None
+    order = MOCK_ORDERS.get(order_id)
+    if order is None:
+        return OrderStatus(order_id, "not_found")
+    return OrderStatus(order_id, order.status, order.side, order.filled_price, order.filled_amount, order.price, order.amount)
+
+def get_order_state(order_id):
+    """Returns only the order's status ("open", "filled", "cancelled" or "not_found")."""
+    order = MOCK_ORDERS.get(order_id)
+    return order.status if order is not None else "not_found"
+
+def get_order_price(order_id):
+    """Returns only the order's limit price, or None if unknown."""
+    order = MOCK_ORDERS.get(order_id)
+    return order.price if order is not None else None
 
 def get_token_balance(token_symbol):
     return MOCK_BALANCES.get(token_symbol, 0.0)
 
 # --- Simulation Functions ---
-def simulate_fill_order(order_id, fill_price=None):
+def simulate_fill_order(order_id, fill_price=None, forced_amount=None):
     """
     Manually simulates an order fill.
     For a buy order, fill_price is the price of the token bought.
     For a sell order, fill_price is the price the token was sold at.
+    forced_amount, if given, is the token amount actually filled (e.g. a fill
+    that comes back short); balances and the emitted fill event both use it.
+    Registered fill callbacks are called before this returns.
     """
     if not strategy_logger:
         print("Logger not set for mock_exchange") # Fallback
@@ -127,38 +216,46 @@ def simulate_fill_order(order_id, fill_price=None):
 
     order.status = "filled"
 
-    base_currency, quote_currency = order.pair_symbol.split('/')
+    base_currency, quote_currency = _split(order.pair_symbol)
 
     if order.side == "buy":
         order.filled_price = fill_price if fill_price is not None else order.price
         # order.amount is USDC for limit buy
-        token_bought = order.amount / order.filled_price
+        if forced_amount is None:
+            token_bought, usdc_spent = order.amount / order.filled_price, order.amount
+        else:
+            token_bought, usdc_spent = forced_amount, forced_amount * order.filled_price
         order.filled_amount = token_bought
 
-        MOCK_BALANCES[quote_currency] = MOCK_BALANCES.get(quote_currency, 0) - order.amount # Spend USDC
-        MOCK_BALANCES[base_currency] = MOCK_BALANCES.get(base_currency, 0) + token_bought
-        strategy_logger.info(f"MockExchange (Simulate): Limit Buy Order {order_id} for {order.pair_symbol} FILLED. Bought: {token_bought} {base_currency} @ {order.filled_price} {quote_currency} (spent {order.amount} {quote_currency})")
+        with _BALANCES_LOCK:
+            MOCK_BALANCES[quote_currency] -= usdc_spent # Spend USDC
+            MOCK_BALANCES[base_currency] += token_bought
+        strategy_logger.info(f"MockExchange (Simulate): Limit Buy Order {order_id} for {order.pair_symbol} FILLED. Bought: {token_bought} {base_currency} @ {order.filled_price} {quote_currency} (spent {usdc_spent} {quote_currency})")
+        _emit_fill(order)
         return True, order.filled_price, token_bought
 
     elif order.side == "sell":
         order.filled_price = fill_price if fill_price is not None else order.price
         # order.amount is token quantity for limit sell
-        usdc_received = order.amount * order.filled_price
-        order.filled_amount = order.amount # Token amount sold
+        token_sold = order.amount if forced_amount is None else forced_amount
+        usdc_received = token_sold * order.filled_price
+        order.filled_amount = token_sold # Token amount sold
 
-        MOCK_BALANCES[base_currency] = MOCK_BALANCES.get(base_currency, 0) - order.amount # Reduce token
-        MOCK_BALANCES[quote_currency] = MOCK_BALANCES.get(quote_currency, 0) + usdc_received
-        strategy_logger.info(f"MockExchange (Simulate): Limit Sell Order {order_id} for {order.pair_symbol} FILLED. Sold: {order.amount} {base_currency} @ {order.filled_price} {quote_currency} (received {usdc_received} {quote_currency})")
-        return True, order.filled_price, order.amount # True, filled_price, token_amount_sold
+        with _BALANCES_LOCK:
+            MOCK_BALANCES[base_currency] -= token_sold # Reduce token
+            MOCK_BALANCES[quote_currency] += usdc_received
+        strategy_logger.info(f"MockExchange (Simulate): Limit Sell Order {order_id} for {order.pair_symbol} FILLED. Sold: {token_sold} {base_currency} @ {order.filled_price} {quote_currency} (received {usdc_received} {quote_currency})")
+        _emit_fill(order)
+        return True, order.filled_price, token_sold # True, filled_price, token_amount_sold
 
     return False, None, 0
 
-
 def reset_mock_exchange():
     global MOCK_ORDERS, MOCK_BALANCES, MOCK_TRADE_HISTORY
     MOCK_ORDERS = {}
-    MOCK_BALANCES = {"USDC": 1000.0}
+    MOCK_BALANCES = defaultdict(float, {"USDC": 1000.0})
     MOCK_TRADE_HISTORY = []
+    _FILL_CALLBACKS.clear() # Managers from before the reset must not see new fills
     if strategy_logger:
         strategy_logger.info("MockExchange: Reset to initial state.")
     else:
@@ -173,23 +270,23 @@ if __name__ == "__main__":
 
     reset_mock_exchange()
 
-    print(f"Initial Balances: {MOCK_BALANCES}")
+    print(f"Initial Balances: {dict(MOCK_BALANCES)}")
 
     # Test Market Buy
     buy_order_id, buy_price, token_bought = market_buy("ETH/USDC", 100) # Buy 100 USDC worth of ETH
     print(f"Market Buy: ID={buy_order_id}, Price={buy_price}, ETH Bought={token_bought}")
-    print(f"Balances after market buy: {MOCK_BALANCES}")
+    print(f"Balances after market buy: {dict(MOCK_BALANCES)}")
 
     # Test Limit Sell
     sell_order_id = limit_sell("ETH/USDC", token_bought, buy_price * 1.02)
     print(f"Limit Sell Placed: ID={sell_order_id}")
-    print(f"Order Status: {get_order_status(sell_order_id)[0]}")
+    print(f"Order Status: {get_order_status(sell_order_id).status}")
 
     # Simulate Sell Fill
     filled, filled_price, sold_amount = simulate_fill_order(sell_order_id)
     print(f"Sell Order Fill: Success={filled}, Filled Price={filled_price}, ETH Sold={sold_amount}")
-    print(f"Order Status: {get_order_status(sell_order_id)[0]}")
-    print(f"Balances after sell: {MOCK_BALANCES}")
+    print(f"Order Status: {get_order_status(sell_order_id).status}")
+    print(f"Balances after sell: {dict(MOCK_BALANCES)}")
 
     # Test Limit Buy
     limit_buy_order_id = limit_buy("ETH/USDC", 10, buy_price * 0.99) # Buy 10 USDC worth of ETH
@@ -198,8 +295,8 @@ if __name__ == "__main__":
     # Simulate Buy Fill
     filled, filled_price, bought_amount = simulate_fill_order(limit_buy_order_id)
     print(f"Buy Order Fill: Success={filled}, Filled Price={filled_price}, ETH Bought={bought_amount}")
-    print(f"Order Status: {get_order_status(limit_buy_order_id)[0]}")
-    print(f"Balances after limit buy: {MOCK_BALANCES}")
+    print(f"Order Status: {get_order_status(limit_buy_order_id).status}")
+    print(f"Balances after limit buy: {dict(MOCK_BALANCES)}")
 
     print("\nMock Orders:")
     for id, order in MOCK_ORDERS.items():
@@ -1,7 +1,61 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from flask import request, jsonify, render_template, session
-from core.backtester import run_backtest, optimize_strategy
+import numpy as np
+
+from core.backtester import run_backtest, optimize_strategy_vec, param_grid
 from modules.utils import get_pairs
 
+logger = logging.getLogger(__name__)
+
+# Backtests and optimizations run off the request worker; clients poll /tasks/<id>.
+_task_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="backtest")
+_tasks: dict[str, tuple[float, Future]] = {}
+_tasks_lock = threading.Lock()
+TASK_RETENTION = 3600  # seconds a finished task's result stays retrievable
+
+
+def _submit(fn, *args):
+    task_id = uuid.uuid4().hex
+    now = time.time()
+    with _tasks_lock:
+        for tid, (created, future) in list(_tasks.items()):
+            if future.done() and now - created > TASK_RETENTION:
+                del _tasks[tid]
+        _tasks[task_id] = (now, _task_executor.submit(fn, *args))
+    return jsonify({'task_id': task_id}), 202
+
+
+def task_status(task_id):
+    with _tasks_lock:
+        entry = _tasks.get(task_id)
+    if entry is None:
+        return jsonify({'state': 'UNKNOWN'}), 404
+    future = entry[1]
+    if not future.done():
+        return jsonify({'state': 'PENDING'})
+    error = future.exception()
+    if error is not None:
+        logger.error("Background task %s failed: %s", task_id, error)
+        return jsonify({'state': 'FAILURE', 'error': str(error)})
+    return jsonify({'state': 'SUCCESS', 'result': future.result()})
+
+
+def _backtest_job(pair, start_date, end_date):
+    return {'results': run_backtest([pair], start_date, end_date)}
+
+
+def _optimize_job(pair, combos, start_date, end_date):
+    best_combo = optimize_strategy_vec(pair, combos, start_date, end_date)
+    if best_combo is None:
+        raise ValueError(f"No market data available for {pair['symbol']} on {pair['exchange']}")
+    return {'best_buy_percentage': best_combo[0], 'best_sell_percentage': best_combo[1]}
+
+
 def backtest(config):
     if 'theme' not in session:
         session['theme'] = 'dark'
@@ -20,8 +74,7 @@ def backtest(config):
             'buy_percentage': -abs(buy_percentage),  # Ensure negative
             'sell_percentage': abs(sell_percentage)  # Ensure positive
         }
-        results = run_backtest([pair], start_date, end_date)
-        return jsonify({'results': results})
+        return _submit(_backtest_job, pair, start_date, end_date)
     exchanges = ['binance', 'bybit', 'gateio', 'bitmart']
     return render_template('backtest.html', pairs=get_pairs(), exchanges=exchanges, notifications={})
 
@@ -31,12 +84,13 @@ def optimize():
     start_date = request.form['start_date']
     end_date = request.form['end_date']
     amount = float(request.form.get('amount', 100.0))
-    buy_range = [x * -0.5 for x in range(1, 11)]  # Negative buy percentages
-    sell_range = [x * 0.5 for x in range(2, 21)]  # Positive sell percentages
+    # Half-percent steps built from integer ranges so the grid values are exact
+    buy_range = np.arange(1, 11, dtype=np.float32) * -0.5  # Negative buy percentages
+    sell_range = np.arange(2, 21, dtype=np.float32) * 0.5  # Positive sell percentages
+    combos = param_grid(buy_range, sell_range, dtype=np.float32)
     pair = {
         'symbol': symbol,
         'exchange': exchange,
         'amount': amount
     }
-    best_combo = optimize_strategy(pair, buy_range, sell_range, start_date, end_date)
-    return jsonify({'best_buy_percentage': best_combo[0], 'best_sell_percentage': best_combo[1]})
+    return _submit(_optimize_job, pair, combos, start_date, end_date)
@@ -18,6 +18,17 @@ portfolio = PortfolioManager(profit_tracker=profit_tracker)
 order_mgr = OrderManager()
 trade_logger = TradeLogger()
 
+# ``main`` imports this module, so ``trade_loop`` is resolved on first use
+# and kept here instead of being re-imported on every bot start.
+_trade_loop = None
+
+
+def _get_trade_loop():
+    global _trade_loop
+    if _trade_loop is None:
+        from main import trade_loop  # Imported here to avoid circular import
+        _trade_loop = trade_loop
+    return _trade_loop
 
 
 class BotManager:
@@ -27,6 +38,8 @@ class BotManager:
         # Maps ``pair_id`` -> thread/running flag
         self.bot_threads: dict[int, threading.Thread] = {}
         self.bot_running: dict[int, bool] = {}
+        # Set when a bot is asked to stop, so its idle wait ends immediately
+        self.stop_events: dict[int, threading.Event] = {}
         self.lock = threading.RLock()
 
     def is_running(self, pair_id: int) -> bool:
@@ -34,11 +47,32 @@ class BotManager:
         with self.lock:
             return self.bot_running.get(pair_id, False)
 
+    def running_ids(self) -> frozenset[int]:
+        """Return a snapshot of the ``pair_id``s whose bots are running.
+
+        Takes the lock once, so callers checking many pairs can use plain
+        set membership instead of calling :meth:`is_running` per pair.
+        """
+        with self.lock:
+            return frozenset(pid for pid, running in self.bot_running.items() if running)
+
+    def wait_for_stop(self, pair_id: int, timeout: float) -> bool:
+        """Sleep up to ``timeout`` seconds; return ``True`` once ``pair_id`` should stop."""
+        with self.lock:
+            event = self.stop_events.get(pair_id)
+        if event is None:
+            return not self.is_running(pair_id)
+        return event.wait(timeout) or not self.is_running(pair_id)
+
     def stop_bot(self, pair_id: int) -> None:
         """Stop and clean up the bot thread for ``pair_id``."""
         with self.lock:
             self.bot_running[pair_id] = False
             thread = self.bot_threads.pop(pair_id, None)
+            event = self.stop_events.pop(pair_id, None)
+
+        if event:
+            event.set()
 
         if thread:
             thread.join(timeout=5)
@@ -61,6 +95,7 @@ class BotManager:
                 return False # Already running
 
             self.bot_running[pair_id] = True
+            self.stop_events[pair_id] = threading.Event()
             thread = threading.Thread(
                 target=run_bot, # run_bot is a global function in this module
                 args=(symbol, pair_config, app_config, flask_app_instance, pair_id, self), # Pass self (BotManager instance)
@@ -76,7 +111,7 @@ def run_bot(symbol, pair_config, config, app=None, pair_id=None, bot_manager_ins
 
     context = app.app_context() if app else nullcontext()
     with context:
-        from main import trade_loop  # Imported here to avoid circular import
+        trade_loop = _get_trade_loop()
         trading_mode = pair_config.get('trading_mode', config.get('trading_mode', 'testnet'))
         # Determine if testnet mode is applicable for ExchangeConfig.setup_exchange
         # It's testnet if mode is 'testnet'. ExchangeConfig handles Binance-specific URLs.
@@ -120,6 +155,7 @@ def run_bot(symbol, pair_config, config, app=None, pair_id=None, bot_manager_ins
                 with bot_manager_instance.lock:
                     bot_manager_instance.bot_running[pair_id] = False
                     bot_manager_instance.bot_threads.pop(pair_id, None)
+                    bot_manager_instance.stop_events.pop(pair_id, None)
             try:
                 order_mgr.cancel_orders(symbol) # order_mgr is global
             except Exception as e:
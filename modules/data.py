@@ -1,18 +1,88 @@
-import pandas as pd
+import numpy as np
 from core.models import Position, ProfitLog, TradeLog, PairProfit
 from flask import jsonify, session
 from modules.bot_control import portfolio, order_mgr, profit_tracker
-from modules.utils import get_price, get_pairs, load_api_keys
-from core.exchange import ExchangeConnector
+from modules.utils import get_price, get_prices, get_pairs, load_api_keys
+from core.exchange import ExchangeConnector, shared_http_session
 from modules.exchange_config import ExchangeConfig # Added import
 from concurrent.futures import ThreadPoolExecutor
+import atexit
+from collections import defaultdict
+from itertools import accumulate
 import logging
-from sqlalchemy import func
+from sqlalchemy import func, text
 from core.extensions import db # Added import
+from core.cache import TTLCache
 
 
 logger = logging.getLogger(__name__)
 
+# Long-lived pools for the dashboard fan-out; /api/data is polled, so paying
+# thread start-up and shutdown on every request adds directly to its latency.
+_EXEC_EXCHANGE = ThreadPoolExecutor(max_workers=8, thread_name_prefix="data-exchange")
+_EXEC_PRICES = ThreadPoolExecutor(max_workers=8, thread_name_prefix="data-prices")
+
+
+@atexit.register
+def _shutdown_executors():
+    _EXEC_EXCHANGE.shutdown(wait=False)
+    _EXEC_PRICES.shutdown(wait=False)
+
+# Balances and P&L move slowly compared to the dashboard poll rate, so serve
+# them from short-lived caches. Balances are keyed by (exchange, mode,
+# currency); P&L is one map of (exchange, mode) -> totals.
+_BAL_CACHE = TTLCache(ttl=10, maxsize=64)
+_PNL_CACHE = TTLCache(ttl=15, maxsize=1)
+# Open orders change only when a bot places/fills/cancels, so a couple of
+# seconds of staleness absorbs back-to-back dashboard polls.
+_ORDERS_CACHE = TTLCache(ttl=2, maxsize=1)
+
+
+def invalidate_pnl_cache():
+    """Drop the cached P&L totals so the next request re-aggregates them."""
+    _PNL_CACHE.clear()
+
+
+def _get_pnl_map() -> dict | None:
+    """Return {(exchange, mode): {"usdc": .., "crypto": ..}} from one GROUP BY query, or None on error."""
+    pnl_map = _PNL_CACHE.get("all")
+    if pnl_map is not None:
+        return pnl_map
+    try:
+        rows = db.session.query(
+            PairProfit.exchange,
+            PairProfit.trading_mode,
+            func.sum(PairProfit.profit_usdc),
+            func.sum(PairProfit.profit_crypto),
+        ).group_by(PairProfit.exchange, PairProfit.trading_mode).all()
+    except Exception as e:
+        logger.error(f"Error calculating P&L in get_data: {e}", exc_info=True)
+        return None
+    pnl_map = {
+        (exchange, mode): {"usdc": round(usdc or 0.0, 2), "crypto": round(crypto or 0.0, 6)}
+        for exchange, mode, usdc, crypto in rows
+    }
+    _PNL_CACHE.set("all", pnl_map)
+    return pnl_map
+
+def _get_orders_map() -> dict:
+    """Return open orders as {symbol: {side: {...}}}, cached briefly for dashboard polling."""
+    orders = _ORDERS_CACHE.get("all")
+    if orders is not None:
+        return orders
+    # ``amount`` here represents the base asset quantity
+    grouped = defaultdict(dict)
+    for order in order_mgr.get_orders():
+        grouped[order.symbol][order.side] = {
+            "price": round(order.price, 4),
+            "amount": round(order.amount, 2),
+            "order_id": order.order_id,
+            "exchange": order.exchange,
+        }
+    orders = dict(grouped)
+    _ORDERS_CACHE.set("all", orders)
+    return orders
+
 # Ensure ExchangeConfig is imported if not already at the top of the file
 # from modules.exchange_config import ExchangeConfig
 
@@ -39,6 +109,8 @@ def _get_connector_data_py(exchange_name: str, mode: str, api_keys_data: dict) -
                 is_testnet=(mode == "testnet"),
                 api_keys_override=api_keys_data # Important: pass the loaded keys
             )
+            # Reuse pooled keep-alive connections across all dashboard connectors
+            ccxt_params['session'] = shared_http_session()
             connector = ExchangeConnector(exchange_id, params=ccxt_params)
             _internal_connectors_data_py[key] = connector
         except Exception as e:
@@ -51,45 +123,22 @@ def _get_connector_data_py(exchange_name: str, mode: str, api_keys_data: dict) -
 def get_data(config, bot_running, app_instance, bot_manager_instance):
     base_currency = session.get("base_currency", "USDC")
     all_pairs_data = get_pairs() # Load all pairs once for active_pairs calculation
-
-    data = {
-        "prices": {},
-        "portfolio": {
-            p.symbol: {"amount": p.amount, "buy_price": p.buy_price}
-            for p in Position.query.all()
-        },
-        "orders": {},
-        "total_profit": profit_tracker.get_total_profit(), # This is global total profit
-        "active_pairs": sum(1 for pair_id in bot_running if bot_running[pair_id]), # This is global active pairs
-        "trade_status": {
-            pair["symbol"]: bool(bot_running.get(pair["id"]))
-            for pair in all_pairs_data # Use all_pairs_data here
-        },
-        "account_info": {},  # This will be populated with detailed info
-    }
-    # Build orders dictionary keyed by symbol -> side
-    # ``amount`` here represents the base asset quantity
-    for order in order_mgr.get_orders():
-        data["orders"].setdefault(order.symbol, {})[order.side] = {
-            "price": round(order.price, 4),
-            "amount": round(order.amount, 2),
-            "order_id": order.order_id,
-            "exchange": order.exchange,
-        }
-
+    running = bot_manager_instance.running_ids() # One locked snapshot for every status check below
 
     api_keys = load_api_keys()
     # exchanges list is implicitly defined by tasks below
 
-    data["account_info"] = {}
+    # Bucket pairs by (exchange, mode) once instead of rescanning them per task
+    pairs_by_ex_mode = defaultdict(list)
+    for p in all_pairs_data:
+        pairs_by_ex_mode[(p['exchange'].lower(), p.get('trading_mode', 'testnet').lower())].append(p)
 
-    # This worker function now fetches balance, P&L, and active pairs per exchange/mode
+    # This worker function now fetches balance and active pairs per exchange/mode
     def fetch_exchange_details(args):
         ex_name, mode_str = args
-        # api_keys, base_currency, all_pairs_data, bot_manager_instance, app_instance are from outer scope
+        # api_keys, base_currency, pairs_by_ex_mode, running are from outer scope
 
         balance_display_value = "N/A"
-        pnl_for_exchange_mode = 0.0
         active_pairs_count = 0
 
         currency_to_fetch = base_currency
@@ -97,61 +146,40 @@ def get_data(config, bot_running, app_instance, bot_manager_instance):
             currency_to_fetch = 'USDT'
 
         # Fetch Balance
-        try:
-            connector = _get_connector_data_py(ex_name, mode_str, api_keys_data=api_keys)
-            raw_balance = connector.get_balance(currency_to_fetch)
-            if raw_balance == "AUTH_ERROR":
-                balance_display_value = "AUTH ERROR"
-            elif raw_balance is None:
-                balance_display_value = "N/A"
-            elif isinstance(raw_balance, (int, float)):
-                balance_display_value = f"{raw_balance:.2f}"
-            else:
-                logger.error(f"Unexpected balance type for {ex_name} ({mode_str}) in get_data worker: {raw_balance} (type: {type(raw_balance)})")
-                balance_display_value = "Invalid Data"
-        except RuntimeError:
-             balance_display_value = "SETUP ERROR"
-        except Exception as e:
-            logger.error(f"Failed to fetch balance for {ex_name} {mode_str} in get_data worker: {e}", exc_info=True)
-            balance_display_value = "ERROR"
-
-        # Calculate P&L
-        try:
-            with app_instance.app_context():
-                pnl_usdc, pnl_crypto = db.session.query(
-                    func.sum(PairProfit.profit_usdc),
-                    func.sum(PairProfit.profit_crypto)
-                ).filter(
-                    PairProfit.exchange == ex_name,
-                    PairProfit.trading_mode == mode_str
-                ).first()
-                pnl_for_exchange_mode = {
-                    "usdc": round(pnl_usdc or 0.0, 2),
-                    "crypto": round(pnl_crypto or 0.0, 6)
-                }
-        except Exception as e:
-            logger.error(
-                f"Error calculating P&L for {ex_name} ({mode_str}) in get_data worker: {e}",
-                exc_info=True,
-            )
-            pnl_for_exchange_mode = {"usdc": "Error", "crypto": "Error"}
+        balance_key = (ex_name, mode_str, currency_to_fetch)
+        cached_balance = _BAL_CACHE.get(balance_key)
+        if cached_balance is not None:
+            balance_display_value = cached_balance
+        else:
+            try:
+                connector = _get_connector_data_py(ex_name, mode_str, api_keys_data=api_keys)
+                raw_balance = connector.get_balance(currency_to_fetch)
+                if raw_balance == "AUTH_ERROR":
+                    balance_display_value = "AUTH ERROR"
+                elif raw_balance is None:
+                    balance_display_value = "N/A"
+                elif isinstance(raw_balance, (int, float)):
+                    balance_display_value = f"{raw_balance:.2f}"
+                    # Only real balances are cached; placeholders retry next poll
+                    _BAL_CACHE.set(balance_key, balance_display_value)
+                else:
+                    logger.error(f"Unexpected balance type for {ex_name} ({mode_str}) in get_data worker: {raw_balance} (type: {type(raw_balance)})")
+                    balance_display_value = "Invalid Data"
+            except RuntimeError:
+                 balance_display_value = "SETUP ERROR"
+            except Exception as e:
+                logger.error(f"Failed to fetch balance for {ex_name} {mode_str} in get_data worker: {e}", exc_info=True)
+                balance_display_value = "ERROR"
 
         # Calculate Active Pairs for this exchange/mode
         try:
-            relevant_pairs = [
-                p for p in all_pairs_data
-                if p['exchange'].lower() == ex_name.lower() and p['trading_mode'].lower() == mode_str.lower()
-            ]
-            active_pairs_count = sum(1 for p in relevant_pairs if bot_manager_instance.is_running(p['id']))
+            relevant_pairs = pairs_by_ex_mode.get((ex_name.lower(), mode_str.lower()), ())
+            active_pairs_count = sum(1 for p in relevant_pairs if p['id'] in running)
         except Exception as e:
             logger.error(f"Error calculating active pairs for {ex_name} ({mode_str}) in get_data worker: {e}", exc_info=True)
             active_pairs_count = "Error"
 
-        return ex_name, mode_str, {
-            "balance": balance_display_value,
-            "pnl": pnl_for_exchange_mode,
-            "active_pairs": active_pairs_count
-        }
+        return ex_name, mode_str, balance_display_value, active_pairs_count
 
     tasks = [
         ("binance", "testnet"),
@@ -161,27 +189,57 @@ def get_data(config, bot_running, app_instance, bot_manager_instance):
         ("bitmart", "real"),
     ]
 
-    with ThreadPoolExecutor(max_workers=5) as exc:
-        results = list(exc.map(fetch_exchange_details, tasks))
+    # One bulk ticker request per (exchange, mode) instead of one per pair
+    groups: dict[tuple[str, str], list[str]] = {}
+    for pair in all_pairs_data:
+        groups.setdefault((pair["exchange"], pair.get("trading_mode", "testnet")), []).append(pair["symbol"])
 
-    for ex_name, mode_str, details_dict in results:
-        data["account_info"][f"{ex_name}_{mode_str}"] = details_dict
+    def fetch_prices(group):
+        (exchange_name, mode), symbols = group
+        try:
+            return get_prices(exchange_name, symbols, mode)
+        except Exception as e:
+            logger.warning("Failed to fetch prices on %s (%s): %s", exchange_name, mode, e)
+            return dict.fromkeys(symbols, "N/A")
 
-    pairs = all_pairs_data # Use already fetched all_pairs_data
+    # Start balance and price fetches together, then do the DB work on this
+    # thread while they are in flight. Workers don't touch the DB session.
+    exchange_futures = [_EXEC_EXCHANGE.submit(fetch_exchange_details, task) for task in tasks]
+    price_futures = [_EXEC_PRICES.submit(fetch_prices, group) for group in groups.items()]
 
-    def fetch_price(pair):
-        symbol = pair["symbol"]
-        mode = pair.get("trading_mode", "testnet")
-        try:
-            price = get_price(pair["exchange"], symbol, mode)
-        except ValueError as e:
-            logger.warning(str(e))
-            return symbol, "N/A"
-        return symbol, price
-
-    with ThreadPoolExecutor(max_workers=min(5, len(pairs))) as exc:
-        for symbol, price in exc.map(fetch_price, pairs):
-            data["prices"][symbol] = price if price != "N/A" else "N/A"
+    data = {
+        "prices": {},
+        "portfolio": {
+            p.symbol: {"amount": p.amount, "buy_price": p.buy_price}
+            for p in Position.query.all()
+        },
+        "orders": _get_orders_map(),
+        "total_profit": profit_tracker.get_total_profit(), # This is global total profit
+        "active_pairs": len(running), # This is global active pairs
+        "trade_status": {
+            pair["symbol"]: pair["id"] in running
+            for pair in all_pairs_data # Use all_pairs_data here
+        },
+        "account_info": {},  # This will be populated with detailed info
+    }
+
+    pnl_map = _get_pnl_map()
+
+    for future in exchange_futures:
+        ex_name, mode_str, balance_display_value, active_pairs_count = future.result()
+        # P&L comes from the single aggregate query above
+        if pnl_map is None:
+            pnl_for_exchange_mode = {"usdc": "Error", "crypto": "Error"}
+        else:
+            pnl_for_exchange_mode = pnl_map.get((ex_name, mode_str), {"usdc": 0.0, "crypto": 0.0})
+        data["account_info"][f"{ex_name}_{mode_str}"] = {
+            "balance": balance_display_value,
+            "pnl": pnl_for_exchange_mode,
+            "active_pairs": active_pairs_count
+        }
+
+    for future in price_futures:
+        data["prices"].update(future.result())
     return jsonify(data)
 
 
@@ -219,9 +277,8 @@ def get_account_balances() -> dict:
     ]
 
     balances: dict[str, str | float] = {}
-    with ThreadPoolExecutor(max_workers=5) as exc:
-        for ex_name, mode, bal in exc.map(fetch_balance, tasks):
-            balances[f"{ex_name}_{mode}"] = bal
+    for ex_name, mode, bal in _EXEC_EXCHANGE.map(fetch_balance, tasks):
+        balances[f"{ex_name}_{mode}"] = bal
 
     return balances
 
@@ -268,27 +325,19 @@ def get_account_balances() -> dict:
 
 def get_profit_data():
     try:
-        # Fetch and sort all profit logs
-        logs = ProfitLog.query.order_by(ProfitLog.timestamp).all()
-
-        if not logs:
-            return jsonify({"timestamps": [], "profits": []})
-
-        # Build a DataFrame
-        df = pd.DataFrame(
-            [
-                {"timestamp": log.timestamp, "profit_usdt": log.profit_usdt}
-                for log in logs
-            ]
+        # Sum profits per timestamp in SQL; only the aggregated rows come back
+        rows = (
+            db.session.query(ProfitLog.timestamp, func.sum(ProfitLog.profit_usdt))
+            .group_by(ProfitLog.timestamp)
+            .order_by(ProfitLog.timestamp)
+            .all()
         )
 
-        df_grouped = df.groupby("timestamp")["profit_usdt"].sum().reset_index()
-        df_grouped["cumulative_profit"] = df_grouped["profit_usdt"].cumsum()
-
+        # A running sum in plain Python; no array round trip for one column
         return jsonify(
             {
-                "timestamps": df_grouped["timestamp"].astype(str).tolist(),
-                "profits": df_grouped["cumulative_profit"].tolist(),
+                "timestamps": [str(timestamp) for timestamp, _ in rows],
+                "profits": list(accumulate(profit or 0.0 for _, profit in rows)),
             }
         )
     except Exception as e:
@@ -313,7 +362,15 @@ def get_trade_data():
         open_trades_query = TradeLog.query.filter(
             TradeLog.side == 'buy',
             ~TradeLog.symbol.in_(closed_symbols)
-        ).order_by(TradeLog.timestamp.desc()) # Example: get latest open buys first
+        ).order_by(TradeLog.timestamp.desc()).with_entities( # Example: get latest open buys first
+            TradeLog.timestamp,
+            TradeLog.symbol,
+            TradeLog.exchange,
+            TradeLog.side,
+            TradeLog.price,
+            TradeLog.amount,
+            TradeLog.usdt_value,
+        )
 
         # If you expect multiple open 'buy' trades for the same symbol, use .all()
         # If only the latest 'buy' for a symbol that isn't sold is considered "the open trade",
@@ -352,40 +409,121 @@ def get_trade_data():
         raise RuntimeError(f"Trade query failed: {e}")
 
 
+def _fifo_open_lots(buys: np.ndarray, sells: np.ndarray) -> np.ndarray:
+    """Remaining quantity of each buy after FIFO matching against later sells.
+
+    ``buys``/``sells`` hold each trade's quantity on its side and 0 otherwise,
+    in trade order. A sell consumes the oldest open buys and any excess over
+    what is open at that moment is dropped, so with ``B``/``S`` the running
+    totals the quantity consumed overall is ``S[-1] + min(0, min(B - S))``;
+    each buy keeps the part of it lying beyond that consumed prefix.
+    """
+    cum_buy = np.cumsum(buys)
+    net = cum_buy - np.cumsum(sells)
+    consumed = (cum_buy[-1] - net[-1]) + min(0.0, net.min())
+    remaining = np.clip(cum_buy - consumed, 0.0, buys)
+    remaining[remaining <= 1e-8] = 0.0
+    return remaining
+
+
+def _side_amounts(trades) -> tuple[np.ndarray, np.ndarray]:
+    sides = [t.side.lower() for t in trades]
+    amounts = np.fromiter((t.amount for t in trades), dtype=np.float64, count=len(trades))
+    buys = np.where([side == "buy" for side in sides], amounts, 0.0)
+    sells = np.where([side == "sell" for side in sides], amounts, 0.0)
+    return buys, sells
+
+
+# FIFO open lots computed server-side; mirrors _fifo_open_lots(). Running
+# buy/sell totals per (symbol, exchange, mode), then each buy keeps the part
+# beyond total_sell + min(0, min(cum_buy - cum_sell)).
+_OPEN_LOTS_SQL = f"""
+WITH running AS (
+    SELECT symbol, exchange, trading_mode, side, amount, price,
+           SUM(CASE WHEN lower(side) = 'buy' THEN amount ELSE 0 END) OVER (
+               PARTITION BY symbol, exchange, trading_mode ORDER BY timestamp, id
+               ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS cum_buy,
+           SUM(CASE WHEN lower(side) = 'sell' THEN amount ELSE 0 END) OVER (
+               PARTITION BY symbol, exchange, trading_mode ORDER BY timestamp, id
+               ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS cum_sell
+    FROM {TradeLog.__tablename__}
+),
+totals AS (
+    SELECT *,
+           MAX(cum_sell) OVER (PARTITION BY symbol, exchange, trading_mode) AS total_sell,
+           MIN(cum_buy - cum_sell) OVER (PARTITION BY symbol, exchange, trading_mode) AS min_net
+    FROM running
+),
+lots AS (
+    SELECT symbol, exchange, trading_mode, price, amount, cum_buy,
+           cum_buy - total_sell - CASE WHEN min_net < 0 THEN min_net ELSE 0 END AS beyond
+    FROM totals
+    WHERE lower(side) = 'buy'
+)
+SELECT symbol, exchange, trading_mode, price,
+       CASE WHEN beyond < amount THEN beyond ELSE amount END AS quantity
+FROM lots
+WHERE beyond > 1e-8 AND amount > 1e-8
+ORDER BY symbol, exchange, trading_mode, cum_buy
+"""
+
+
+def _window_functions_supported() -> bool:
+    if db.engine.dialect.name != "sqlite":
+        return True
+    import sqlite3
+    return sqlite3.sqlite_version_info >= (3, 25, 0)
+
+
+def _open_lots_sql() -> dict[tuple[str, str, str], list[tuple[float, float]]]:
+    lots: dict[tuple[str, str, str], list[tuple[float, float]]] = {}
+    for symbol, exchange, mode, price, qty in db.session.execute(text(_OPEN_LOTS_SQL)):
+        lots.setdefault((symbol, exchange, mode), []).append((price, qty))
+    return lots
+
+
+def _open_lots_python() -> dict[tuple[str, str, str], list[tuple[float, float]]]:
+    # Plain column tuples: no ORM instances or identity-map bookkeeping
+    trades = (
+        db.session.query(
+            TradeLog.symbol,
+            TradeLog.exchange,
+            TradeLog.trading_mode,
+            TradeLog.side,
+            TradeLog.amount,
+            TradeLog.price,
+        )
+        .order_by(TradeLog.timestamp, TradeLog.id)
+        .all()
+    )
+    grouped: dict[tuple[str, str, str], list] = {}
+    for t in trades:
+        grouped.setdefault(t[:3], []).append(t)
+
+    lots: dict[tuple[str, str, str], list[tuple[float, float]]] = {}
+    for key, tlist in grouped.items():
+        remaining = _fifo_open_lots(*_side_amounts(tlist))
+        open_idx = np.flatnonzero(remaining)
+        if open_idx.size:
+            lots[key] = [(tlist[i].price, float(remaining[i])) for i in open_idx]
+    return lots
+
+
 def get_open_positions():
     """Return a list of open buy positions with unrealized P/L."""
     try:
-        trades = TradeLog.query.order_by(TradeLog.timestamp).all()
-        grouped: dict[tuple[str, str, str], list[TradeLog]] = {}
-        for t in trades:
-            key = (t.symbol, t.exchange, t.trading_mode)
-            grouped.setdefault(key, []).append(t)
+        if _window_functions_supported():
+            lots = _open_lots_sql()
+        else:
+            lots = _open_lots_python()
 
         positions = []
-        for (symbol, exchange, mode), tlist in grouped.items():
-            queue: list[list[float]] = []  # [qty, price]
-            for tr in tlist:
-                if tr.side.lower() == "buy":
-                    queue.append([tr.amount, tr.price])
-                elif tr.side.lower() == "sell":
-                    qty = tr.amount
-                    while qty > 0 and queue:
-                        buy_qty, buy_price = queue[0]
-                        if buy_qty <= qty + 1e-8:
-                            qty -= buy_qty
-                            queue.pop(0)
-                        else:
-                            queue[0][0] = buy_qty - qty
-                            qty = 0
-
-            if not queue:
-                continue
-
+        for (symbol, exchange, mode), open_lots in lots.items():
             current_price = get_price(exchange, symbol, mode)
             if current_price == "N/A":
                 current_price = None
 
-            for qty, buy_price in queue:
+            for buy_price, qty in open_lots:
                 pnl = None
                 if current_price is not None:
                     pnl = (current_price - buy_price) * qty
@@ -412,25 +550,16 @@ def clear_open_positions(symbol: str, exchange: str, mode: str | None = None) ->
         query = TradeLog.query.filter_by(symbol=symbol, exchange=exchange)
         if mode:
             query = query.filter_by(trading_mode=mode)
-        trades = query.order_by(TradeLog.timestamp).all()
-
-        queue: list[tuple[TradeLog, float]] = []
-        for tr in trades:
-            if tr.side.lower() == "buy":
-                queue.append((tr, tr.amount))
-            elif tr.side.lower() == "sell":
-                qty = tr.amount
-                while qty > 0 and queue:
-                    buy_tr, buy_qty = queue[0]
-                    if buy_qty <= qty + 1e-8:
-                        qty -= buy_qty
-                        queue.pop(0)
-                    else:
-                        queue[0] = (buy_tr, buy_qty - qty)
-                        qty = 0
-
-        for buy_tr, _ in queue:
-            db.session.delete(buy_tr)
+        trades = query.order_by(TradeLog.timestamp).with_entities(
+            TradeLog.id, TradeLog.side, TradeLog.amount
+        ).all()
+
+        if trades:
+            remaining = _fifo_open_lots(*_side_amounts(trades))
+            ids = [trades[i].id for i in np.flatnonzero(remaining)]
+            if ids:
+                # One DELETE ... WHERE id IN (...) instead of one per open buy
+                TradeLog.query.filter(TradeLog.id.in_(ids)).delete(synchronize_session=False)
         db.session.commit()
         return True
     except Exception as e:  # pragma: no cover - DB issues
@@ -1,6 +1,28 @@
-import os
 # from modules.utils import load_api_keys # Old import
-from modules.key_loader import load_api_keys # New import
+from modules.key_loader import load_api_keys, getenv # New import
+
+# (exchange, mode) -> (api key env var, secret env var, uid env var)
+_ENV_TABLE = {
+    ("binance", "testnet"): ("BINANCE_TESTNET_API_KEY", "BINANCE_TESTNET_SECRET_KEY", ""),
+    ("binance", "real"): ("BINANCE_REAL_API_KEY", "BINANCE_REAL_SECRET_KEY", ""),
+    ("bybit", "real"): ("BYBIT_REAL_API_KEY", "BYBIT_REAL_SECRET_KEY", ""),
+    ("gateio", "real"): ("GATEIO_REAL_API_KEY", "GATEIO_REAL_SECRET_KEY", ""),
+    ("bitmart", "real"): ("BITMART_REAL_API_KEY", "BITMART_REAL_SECRET_KEY", "BITMART_UID"),
+}
+
+# ccxt ``options`` per (exchange, mode); copied into each params dict so a
+# connector can never mutate the shared template.
+_OPTIONS_TEMPLATES = {
+    # Avoid SAPI currency calls during load_markets on the Binance testnet
+    ("binance", "testnet"): {'defaultType': 'spot', 'fetchCurrencies': False},
+    # For market buy orders with quote currency amount passed as 'amount'
+    ("gateio", "real"): {'createMarketBuyOrderRequiresPrice': False},
+}
+
+# exchange -> supported modes, for error messages
+_EXCHANGE_MODES: dict[str, list[str]] = {}
+for _exchange, _mode in _ENV_TABLE:
+    _EXCHANGE_MODES.setdefault(_exchange, []).append(_mode)
 
 class ExchangeConfig:
     """Utility to configure CCXT exchanges with API keys from environment vars."""
@@ -23,31 +45,17 @@ class ExchangeConfig:
         keys = api_keys_override if api_keys_override is not None else load_api_keys()
         mode = "testnet" if is_testnet else "real"
 
-        key_env = {
-            "binance": {"testnet": "BINANCE_TESTNET_API_KEY", "real": "BINANCE_REAL_API_KEY"},
-            "bybit": {"real": "BYBIT_REAL_API_KEY"},
-            "gateio": {"real": "GATEIO_REAL_API_KEY"},
-            "bitmart": {"real": "BITMART_REAL_API_KEY"},
-        }
+        entry = _ENV_TABLE.get((exchange_name, mode))
+        if entry is None:
+            if exchange_name not in _EXCHANGE_MODES:
+                raise ValueError(f"Unsupported exchange: {exchange_name}")
+            raise ValueError(f"Unsupported mode '{mode}' for exchange: {exchange_name}. This exchange only supports: {_EXCHANGE_MODES[exchange_name]}")
+        key_env, secret_env, uid_env = entry
 
-        secret_env = {
-            "binance": {"testnet": "BINANCE_TESTNET_SECRET_KEY", "real": "BINANCE_REAL_SECRET_KEY"},
-            "bybit": {"real": "BYBIT_REAL_SECRET_KEY"},
-            "gateio": {"real": "GATEIO_REAL_SECRET_KEY"},
-            "bitmart": {"real": "BITMART_REAL_SECRET_KEY"},
-        }
-
-        uid_env = {"bitmart": "BITMART_UID"}
-
-        if exchange_name not in key_env:
-            raise ValueError(f"Unsupported exchange: {exchange_name}")
-
-        if mode not in key_env[exchange_name]:
-            raise ValueError(f"Unsupported mode '{mode}' for exchange: {exchange_name}. This exchange only supports: {list(key_env[exchange_name].keys())}")
-
-        api_key = os.getenv(key_env[exchange_name][mode]) or keys.get(exchange_name, {}).get(mode, {}).get("api_key")
-        api_secret = os.getenv(secret_env[exchange_name][mode]) or keys.get(exchange_name, {}).get(mode, {}).get("secret_key")
-        uid = os.getenv(uid_env.get(exchange_name, ""), "") or keys.get(exchange_name, {}).get(mode, {}).get("uid", "")
+        mode_keys = keys.get(exchange_name, {}).get(mode, {})
+        api_key = getenv(key_env) or mode_keys.get("api_key")
+        api_secret = getenv(secret_env) or mode_keys.get("secret_key")
+        uid = getenv(uid_env, "") or mode_keys.get("uid", "")
 
         if not api_key or not api_secret or (api_key and api_key.startswith("your_")) or (api_secret and api_secret.startswith("your_")):
             raise RuntimeError(
@@ -56,25 +64,16 @@ class ExchangeConfig:
 
         params = {"apiKey": api_key, "secret": api_secret, "enableRateLimit": True}
 
+        options = _OPTIONS_TEMPLATES.get((exchange_name, mode))
+        if options is not None:
+            params['options'] = options.copy()
+
         if exchange_name == "binance" and is_testnet:
             # Remove explicit URL setting; rely on set_sandbox_mode(True) in ExchangeConnector
             # params["urls"] = {"api": "https://testnet.binance.vision/api"}
-            current_options = params.setdefault('options', {})
-            current_options.update({
-                'defaultType': 'spot',
-                'fetchCurrencies': False
-            })
             params['_force_sandbox_mode'] = True # Custom flag for ExchangeConnector
-            # This aims to prevent errors during load_markets if fetch_currencies causes SAPI issues.
             # fetch_balance itself might still attempt SAPI calls.
 
-        if exchange_name == "gateio":
-            # For market buy orders with quote currency amount passed as 'amount'
-            current_options = params.setdefault('options', {})
-            current_options.update({
-                'createMarketBuyOrderRequiresPrice': False
-            })
-
         if exchange_name == "bitmart":
             params["uid"] = uid
             params.setdefault("memo", "")
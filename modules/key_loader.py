@@ -1,5 +1,5 @@
 import os
-import json
+import orjson
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,6 +7,58 @@ logger = logging.getLogger(__name__)
 # This set tracks modes for which a warning about default keys has already been issued.
 _warned_modes = set()
 
+# Layout version stamped into api_keys.json; files carrying it skip the
+# old-format migration check.
+SCHEMA_VERSION = 2
+
+_EXCHANGES = ["binance", "bybit", "gateio", "bitmart"]
+_KNOWN_KEYS = frozenset(_EXCHANGES) | {"_schema_version"}
+
+# Last parsed keys as ``((st_mtime_ns, st_size), keys)``; replaced as a whole
+# so concurrent readers never see a signature paired with the wrong keys.
+_cached_keys: tuple | None = None
+
+
+# Snapshot of os.environ taken on first use; credential lookups read this
+# plain dict instead of going through the os.environ proxy each time.
+_env: dict[str, str] | None = None
+
+
+def refresh_env():
+    """Re-snapshot ``os.environ``, e.g. after ``load_dotenv()`` or reconfiguration."""
+    global _env
+    _env = dict(os.environ)
+    invalidate_api_keys_cache()  # Default keys are filled from the environment
+    return _env
+
+
+def getenv(name, default=None):
+    """Like :func:`os.getenv`, but served from the cached environment snapshot."""
+    env = _env
+    if env is None:
+        env = refresh_env()
+    return env.get(name, default)
+
+
+def _is_placeholder(api_key, secret_key):
+    """Return ``True`` if either credential is empty or a ``your_...`` template value."""
+    return not api_key or not secret_key or api_key[:5] == "your_" or secret_key[:5] == "your_"
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def invalidate_api_keys_cache():
+    """Forget the cached keys so the next :func:`load_api_keys` re-reads the file."""
+    global _cached_keys
+    _cached_keys = None
+
+
 def load_api_keys():
     """Load API keys from ``api_keys.json``.
 
@@ -20,10 +72,18 @@ def load_api_keys():
         }
 
     If an old style file is detected it will be migrated automatically.
+    The parsed result is reused until the file's mtime or size changes;
+    callers must not mutate it in place.
     """
+    global _cached_keys
 
     api_keys_file = "api_keys.json"
-    exchanges = ["binance", "bybit", "gateio", "bitmart"]
+    signature = _file_signature(api_keys_file)
+    cached = _cached_keys
+    if signature is not None and cached is not None and cached[0] == signature:
+        return cached[1]
+
+    exchanges = _EXCHANGES
 
     def _default_for(ex):
         test_key_env = {
@@ -54,71 +114,66 @@ def load_api_keys():
 
         data = {
             "real": {
-                "api_key": os.getenv(real_key_env, "your_real_api_key"),
-                "secret_key": os.getenv(real_secret_env, "your_real_secret"),
-                "uid": os.getenv(uid_env, "") if uid_env else "",
+                "api_key": getenv(real_key_env, "your_real_api_key"),
+                "secret_key": getenv(real_secret_env, "your_real_secret"),
+                "uid": getenv(uid_env, "") if uid_env else "",
             },
         }
         if ex == "binance":
             data["testnet"] = {
-                "api_key": os.getenv(test_key_env, "your_testnet_api_key"),
-                "secret_key": os.getenv(test_secret_env, "your_testnet_secret"),
+                "api_key": getenv(test_key_env, "your_testnet_api_key"),
+                "secret_key": getenv(test_secret_env, "your_testnet_secret"),
                 "uid": "",
             }
         return data
 
     default_keys = {ex: _default_for(ex) for ex in exchanges}
-
-    if os.path.exists(api_keys_file):
-        with open(api_keys_file, "r") as f:
+    default_keys["_schema_version"] = SCHEMA_VERSION
+
+    file_exists = signature is not None  # From the single stat() above
+    # Only rewrite the file when it is missing, unreadable or migrated below;
+    # a valid file is never re-serialized just because it was loaded.
+    needs_write = not file_exists
+    if file_exists:
+        with open(api_keys_file, "rb") as f:
             try:
-                keys = json.load(f)
-            except json.JSONDecodeError:
+                keys = orjson.loads(f.read())
+                if not isinstance(keys, dict):
+                    raise orjson.JSONDecodeError("top level is not an object", "", 0)
+            except orjson.JSONDecodeError:
                 logger.error(f"Error decoding {api_keys_file}. Using default keys structure.")
                 keys = default_keys # Fallback to default structure on decode error
+                needs_write = True
     else:
         keys = default_keys # Initialize with default if file doesn't exist
 
-    # Ensure the file exists with default content if it was missing or corrupt
-    if not os.path.exists(api_keys_file) or "_env_variables" not in keys: # A simple check if it's an old format or freshly made
-        # This part handles migration or creation of a new file with defaults
-        # Let's refine the logic for creating/migrating
-
-        # If file existed but was corrupt and got replaced by default_keys, or if file didn't exist:
-        if not os.path.exists(api_keys_file) or (os.path.exists(api_keys_file) and keys == default_keys) :
-             with open(api_keys_file, "w") as f:
-                json.dump(default_keys, f, indent=2)
-             if not os.path.exists(api_keys_file): # only log if it was truly created
-                logger.info(f"Created default {api_keys_file}. Please update with valid API keys.")
-        else: # File existed and was loaded, check for migration
-            # migrate old layout if necessary (original logic from utils.py)
-            if "testnet" in keys or "real" in keys: # Heuristic for old top-level structure
-                migrated = {ex: _default_for(ex) for ex in exchanges} # Start with fresh defaults
-                # Carefully merge data from old structure
-                if "binance" in migrated: # Ensure binance default structure exists
-                    if "testnet" in keys and isinstance(keys["testnet"], dict):
-                         migrated["binance"]["testnet"].update(keys["testnet"])
-                    if "real" in keys and isinstance(keys["real"], dict):
-                         migrated["binance"]["real"].update(keys["real"])
-
-                for ex_key in keys: # Iterate over keys present in the loaded file
-                    if ex_key in migrated and isinstance(keys[ex_key], dict) and "api_key" in keys[ex_key]: # Old flat structure per exchange
-                        if ex_key == "binance": # if it's binance, it might be old testnet keys
-                             # This part of original migration was a bit ambiguous.
-                             # Assuming old flat keys for binance were for testnet if not otherwise specified.
-                             # However, _default_for already sets up binance testnet/real.
-                             # A direct update like this might be problematic if keys['binance'] was for 'real'.
-                             # The original logic: migrated[ex]['testnet'].update(keys[ex])
-                             # This seems safer if old binance keys were real:
-                             # migrated[ex_key]['real'].update(keys[ex_key])
-                             pass # Defaults for binance are already good, specific testnet/real handling above is better
-                        elif ex_key in migrated: # For other exchanges, assume they were 'real'
-                            migrated[ex_key]['real'].update(keys[ex_key])
-                keys = migrated
-                with open(api_keys_file, "w") as f:
-                    json.dump(keys, f, indent=2)
-                logger.info(f"Migrated {api_keys_file} to new multi-exchange format.")
-
+    if needs_write:
+        # File was missing or corrupt: write the defaults
+        with open(api_keys_file, "wb") as f:
+            f.write(orjson.dumps(default_keys, option=orjson.OPT_INDENT_2))
+        if not file_exists: # only log if it was truly created
+            logger.info(f"Created default {api_keys_file}. Please update with valid API keys.")
+        signature = None
+    elif keys.get("_schema_version") != SCHEMA_VERSION and ("testnet" in keys or "real" in keys):
+        # Old layout had top-level testnet/real sections for Binance and flat
+        # {"api_key", ...} dicts for the other exchanges, assumed to be 'real'.
+        migrated = {ex: _default_for(ex) for ex in exchanges} # Start with fresh defaults
+        migrated["_schema_version"] = SCHEMA_VERSION
+        for mode in ("testnet", "real"):
+            if isinstance(keys.get(mode), dict):
+                migrated["binance"][mode].update(keys[mode])
+        for ex_key in exchanges:
+            if ex_key != "binance" and isinstance(keys.get(ex_key), dict) and "api_key" in keys[ex_key]:
+                migrated[ex_key]["real"].update(keys[ex_key])
+        keys = migrated
+        with open(api_keys_file, "wb") as f:
+            f.write(orjson.dumps(keys, option=orjson.OPT_INDENT_2))
+        logger.info(f"Migrated {api_keys_file} to new multi-exchange format.")
+        signature = None
+
+    # Keep only the entries this app reads; anything else pasted into the file
+    # is not carried in the cached dict (or written back on the next save).
+    keys = {k: v for k, v in keys.items() if k in _KNOWN_KEYS}
 
     # Ensure every exchange and mode sub-dictionary exists to prevent KeyErrors later
     for ex_name in exchanges:
@@ -131,27 +186,29 @@ def load_api_keys():
             # Remove 'testnet' if it somehow exists for non-binance exchanges from old files
             if "testnet" in keys[ex_name] and ex_name != "binance":
                 del keys[ex_name]["testnet"]
+    # The layout is current now; the stamp is persisted on the next save
+    keys.setdefault("_schema_version", SCHEMA_VERSION)
 
 
     # Warning for default/placeholder keys
     for ex_name in exchanges:
         modes_to_check = ["testnet", "real"] if ex_name == "binance" else ["real"]
         for mode in modes_to_check:
+            # Use a more specific key for _warned_modes to avoid repeated warnings for same exchange/mode
+            warning_key = f"{ex_name}_{mode}"
+            if warning_key in _warned_modes:
+                continue
             current_keys = keys.get(ex_name, {}).get(mode, {})
-            api_key = current_keys.get("api_key", "")
-            secret_key = current_keys.get("secret_key", "")
-
-            is_placeholder = (api_key.startswith("your_") or not api_key or
-                              secret_key.startswith("your_") or not secret_key)
-
-            if is_placeholder:
-                # Use a more specific key for _warned_modes to avoid repeated warnings for same exchange/mode
-                warning_key = f"{ex_name}_{mode}"
-                if warning_key not in _warned_modes:
-                    logger.warning(
-                        "Using default or placeholder API keys for %s %s. "
-                        "Please update %s or relevant environment variables.",
-                        ex_name.capitalize(), mode, api_keys_file
-                    )
-                    _warned_modes.add(warning_key)
+            if _is_placeholder(current_keys.get("api_key", ""), current_keys.get("secret_key", "")):
+                logger.warning(
+                    "Using default or placeholder API keys for %s %s. "
+                    "Please update %s or relevant environment variables.",
+                    ex_name.capitalize(), mode, api_keys_file
+                )
+                _warned_modes.add(warning_key)
+
+    # Stat again only if the file was (re)written above
+    if signature is None:
+        signature = _file_signature(api_keys_file)
+    _cached_keys = (signature, keys)
     return keys
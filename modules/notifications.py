@@ -1,36 +1,93 @@
-import json
+import atexit
 import os
-import pandas as pd
+import threading
+import time
+import orjson
 from collections import defaultdict
-from flask import jsonify
+from datetime import datetime
+from types import MappingProxyType
+from typing import NamedTuple
+from flask import Response, jsonify
 
 NOTIFICATIONS_FILE = 'notifications.json'
 
+# add_notification only rewrites the file every FLUSH_EVERY appends for a
+# symbol or once FLUSH_INTERVAL seconds have passed; the rest are flushed
+# by the next write or at exit.
+FLUSH_EVERY = 16
+FLUSH_INTERVAL = 2.0
+
+_lock = threading.RLock()
+_dirty = False
+_last_flush = time.monotonic()
+
+class Notification(NamedTuple):
+    """One notification entry; a tuple is far smaller than a per-entry dict."""
+    message: str
+    type: str
+    timestamp: str
+
+
+def _default(obj):
+    # orjson hands NamedTuples to ``default``; keep the on-disk/API shape as objects
+    if isinstance(obj, Notification):
+        return obj._asdict()
+    raise TypeError
+
 def load_notifications():
     if os.path.exists(NOTIFICATIONS_FILE):
-        with open(NOTIFICATIONS_FILE, 'r') as f:
-            return defaultdict(list, json.load(f))
+        with open(NOTIFICATIONS_FILE, 'rb') as f:
+            raw = orjson.loads(f.read())
+        return defaultdict(list, {
+            symbol: [Notification(m.get('message', ''), m.get('type', ''), m.get('timestamp', '')) for m in messages]
+            for symbol, messages in raw.items()
+        })
     return defaultdict(list)
 
+def _write(data):
+    # Write a sibling temp file and swap it in so readers never see a partial file
+    tmp_path = NOTIFICATIONS_FILE + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(data, default=_default))
+    os.replace(tmp_path, NOTIFICATIONS_FILE)
+
 def save_notifications(notifications):
-    with open(NOTIFICATIONS_FILE, 'w') as f:
-        json.dump(dict(notifications), f)
+    global _dirty, _last_flush
+    with _lock:
+        _write(dict(notifications))
+        _dirty = False
+        _last_flush = time.monotonic()
+
+def _flush():
+    with _lock:
+        if _dirty:
+            save_notifications(notifications)
 
 notifications = load_notifications()
+atexit.register(_flush)
 
 def add_notification(symbol, message, msg_type):
-    notifications[symbol].append({
-        'message': message,
-        'type': msg_type,
-        'timestamp': pd.Timestamp.now().isoformat()
-    })
-    save_notifications(notifications)
+    global _dirty
+    with _lock:
+        messages = notifications[symbol]
+        messages.append(Notification(message, msg_type, datetime.now().isoformat()))
+        _dirty = True
+        if len(messages) % FLUSH_EVERY == 0 or time.monotonic() - _last_flush > FLUSH_INTERVAL:
+            save_notifications(notifications)
 
 def get_notifications():
-    return dict(notifications)
+    """Return a read-only live view of the notifications, without copying them."""
+    return MappingProxyType(notifications)
+
+def notifications_response():
+    """Serialize the notifications straight to a JSON response."""
+    # orjson runs without releasing the GIL, so appends can't interleave;
+    # keys are sorted to match Flask's jsonify output.
+    return Response(orjson.dumps(notifications, default=_default, option=orjson.OPT_SORT_KEYS), mimetype='application/json')
 
 def clear_notifications():
     global notifications
-    notifications.clear()
-    save_notifications(notifications)
+    with _lock:
+        notifications.clear()
+        save_notifications(notifications)
     return jsonify({'status': 'Notifications cleared'})
@@ -1,11 +1,51 @@
+import copy
+import threading
+import time
+from collections import deque
 from core.models import TradingPair
 from flask import request, redirect, url_for, flash, render_template, session, jsonify, current_app
-from modules.utils import get_pairs, load_api_keys, save_api_keys, get_exchange_pairs
+from modules.utils import get_pairs, invalidate_pairs_cache, load_api_keys, save_api_keys, get_exchange_pairs, get_exchange_pairs_set
 import yaml
-from modules.notifications import notifications, save_notifications
+try:  # libyaml-backed emitter when PyYAML was built with it
+    from yaml import CSafeDumper as _SafeDumper
+except ImportError:  # pragma: no cover - pure-Python fallback
+    from yaml import SafeDumper as _SafeDumper
+from sqlalchemy import delete, select
+from modules.notifications import notifications, save_notifications, get_notifications
 from modules.bot_control import bot_manager
 from modules.auth import users, bcrypt
 from core.extensions import db
+from core.config import invalidate_config_cache
+
+# bcrypt checks are deliberately slow; cap failed password-change attempts per
+# client so repeated guesses can't tie up the workers.
+PASSWORD_ATTEMPT_LIMIT = 5
+PASSWORD_ATTEMPT_WINDOW = 60  # seconds
+_password_attempts: dict[str, deque] = {}
+_password_attempts_lock = threading.Lock()
+
+
+def _prune_password_attempts(now: float) -> None:
+    """Drop attempts older than the window; caller holds the lock."""
+    for key in [k for k, q in _password_attempts.items() if now - q[-1] > PASSWORD_ATTEMPT_WINDOW]:
+        del _password_attempts[key]
+    for attempts in _password_attempts.values():
+        while now - attempts[0] > PASSWORD_ATTEMPT_WINDOW:
+            attempts.popleft()
+
+
+def _password_attempts_exceeded(client: str) -> bool:
+    """``True`` once ``client`` has used up its failed attempts for the window."""
+    now = time.monotonic()
+    with _password_attempts_lock:
+        _prune_password_attempts(now)
+        return len(_password_attempts.get(client, ())) >= PASSWORD_ATTEMPT_LIMIT
+
+
+def _record_failed_password_attempt(client: str) -> None:
+    """Count one failed password check against ``client``."""
+    with _password_attempts_lock:
+        _password_attempts.setdefault(client, deque()).append(time.monotonic())
 
 
 def save_settings_yaml(config):
@@ -16,7 +56,8 @@ def save_settings_yaml(config):
         'pairs': get_pairs(),
     }
     with open('settings.yaml', 'w') as f:
-        yaml.safe_dump(data, f)
+        yaml.dump(data, f, Dumper=_SafeDumper, default_flow_style=False)
+    invalidate_config_cache()
 
 def settings():
     if 'theme' not in session:
@@ -37,7 +78,7 @@ def settings():
 
     return render_template('settings.html',
                            pairs=enumerated_pairs,
-                           notifications=dict(notifications),
+                           notifications=get_notifications(),
                            available_pairs=available_pairs,
                            exchanges=exchanges,
                            saved_pairs=all_pairs,
@@ -58,33 +99,43 @@ def api_update_general(config):
 
 def api_update_pairs(): 
     selected_pairs = request.form.getlist('selected_pairs')
+    ids = [int(pair_id) for pair_id in selected_pairs]
 
-    # Remove pairs not selected
-    existing_ids = {pair.id for pair in TradingPair.query.all()}
-    ids_to_delete = existing_ids - set(map(int, selected_pairs))
-    if ids_to_delete:
-        TradingPair.query.filter(TradingPair.id.in_(ids_to_delete)).delete(synchronize_session=False)
-
-    for pair_id in selected_pairs:
-        pair_id = int(pair_id)
+    # Parse and validate the form before touching the DB
+    get_field = request.form.get  # Resolve the request proxy once for the whole loop
+    updates = []
+    for pair_id in ids:
+        sid = str(pair_id)
         try:
-            buy_pct = float(request.form.get(f'buy_percentage_{pair_id}', '2.0'))
-            sell_pct = float(request.form.get(f'sell_percentage_{pair_id}', '3.0'))
-            amount = float(request.form.get(f'amount_{pair_id}', '100.0'))
-            exchange = request.form.get(f'exchange_{pair_id}', 'binance')
-            mode = request.form.get(f'trading_mode_{pair_id}', 'testnet')
-            profit_mode = request.form.get(f'profit_mode_{pair_id}', 'usdc')
+            buy_pct = float(get_field('buy_percentage_' + sid, '2.0'))
+            sell_pct = float(get_field('sell_percentage_' + sid, '3.0'))
+            amount = float(get_field('amount_' + sid, '100.0'))
+            exchange = get_field('exchange_' + sid, 'binance')
+            mode = get_field('trading_mode_' + sid, 'testnet')
+            profit_mode = get_field('profit_mode_' + sid, 'usdc')
         except ValueError:
             return jsonify({'status': 'error', 'message': f'Invalid numeric input for pair {pair_id}.'}), 400
 
-        pair = TradingPair.query.get(pair_id)
-        pair_symbol = pair.symbol if pair else f'pair {pair_id}'
-
         if buy_pct >= 0:
+            pair = db.session.get(TradingPair, pair_id)
+            pair_symbol = pair.symbol if pair else f'pair {pair_id}'
             return jsonify({'status': 'error', 'message': f'Invalid Buy % for {pair_symbol}. Must be negative.'}), 400
 
-        available = get_exchange_pairs(exchange, mode)
-        if pair and pair.symbol not in available:
+        updates.append((pair_id, buy_pct, sell_pct, amount, exchange, mode, profit_mode))
+
+    # Remove pairs not selected
+    existing_ids = {pair_id for (pair_id,) in TradingPair.query.with_entities(TradingPair.id).all()}
+    ids_to_delete = existing_ids - set(ids)
+    if ids_to_delete:
+        TradingPair.query.filter(TradingPair.id.in_(ids_to_delete)).delete(synchronize_session=False)
+
+    # Load every selected pair in one query
+    pairs_by_id = {pair.id: pair for pair in TradingPair.query.filter(TradingPair.id.in_(ids)).all()}
+
+    for pair_id, buy_pct, sell_pct, amount, exchange, mode, profit_mode in updates:
+        pair = pairs_by_id.get(pair_id)
+
+        if pair and pair.symbol not in get_exchange_pairs_set(exchange, mode):
             return jsonify({'status': 'error', 'message': f'{pair.symbol} not available on {exchange}.'}), 400
 
         if pair:
@@ -95,16 +146,18 @@ def api_update_pairs():
             pair.trading_mode = mode
             pair.profit_mode = profit_mode if profit_mode in ['usdc', 'crypto'] else 'usdc'
 
+    # Read symbols before commit expires the loaded rows
+    selected_symbols = [pairs_by_id[pair_id].symbol for pair_id in ids if pair_id in pairs_by_id]
+
     db.session.commit()
+    invalidate_pairs_cache()
 
     save_settings_yaml(current_app.config)
 
-    # Update notifications
+    # Update notifications: swap in the new per-symbol lists, then write once
+    new_notifications = {symbol: [] for symbol in selected_symbols}
     notifications.clear()
-    for pair_id in selected_pairs:
-        pair = TradingPair.query.get(int(pair_id))
-        if pair:
-            notifications[pair.symbol] = []
+    notifications.update(new_notifications)
     save_notifications(notifications)
 
     return jsonify({'status': 'success', 'message': 'Trading pairs updated successfully!'})
@@ -115,7 +168,7 @@ def api_add_pair():
     new_pair = request.form.get('new_pair')
     mode = request.form.get('trading_mode', 'testnet')
     profit_mode = request.form.get('profit_mode', 'usdc')
-    available_pairs = get_exchange_pairs(exchange, mode)
+    available_pairs = get_exchange_pairs_set(exchange, mode)
 
     if not new_pair:
         return jsonify({'status': 'error', 'message': 'Pair symbol missing.'}), 400
@@ -138,6 +191,7 @@ def api_add_pair():
     )
     db.session.add(pair)
     db.session.commit()
+    invalidate_pairs_cache()
 
     notifications[new_pair] = []
     save_notifications(notifications)
@@ -151,23 +205,30 @@ def api_remove_pair():
     if not pair_id:
         return jsonify({'status': 'error', 'message': 'No pair provided.'}), 400
 
-    pair = TradingPair.query.get(pair_id)
-    deleted = TradingPair.query.filter_by(id=pair_id).delete()
+    # Delete and get the symbol back in one statement where the DB supports it
+    stmt = delete(TradingPair).where(TradingPair.id == pair_id)
+    if db.session.get_bind().dialect.delete_returning:
+        row = db.session.execute(stmt.returning(TradingPair.symbol)).first()
+    else:
+        row = db.session.execute(select(TradingPair.symbol).where(TradingPair.id == pair_id)).first()
+        if row:
+            db.session.execute(stmt)
     db.session.commit()
-
-    if pair:
-        notifications.pop(pair.symbol, None)
+    invalidate_pairs_cache()
 
     if bot_manager.is_running(pair_id):
         bot_manager.stop_bot(pair_id)
 
-    save_notifications(notifications)
+    if row:
+        notifications.pop(row.symbol, None)
+        save_notifications(notifications)
 
     return jsonify({'status': 'success', 'message': 'Removed pair successfully!'})
 
 
 def api_update_api_keys():
-    api_keys = load_api_keys()
+    # Copy: load_api_keys() returns a shared cached dict
+    api_keys = copy.deepcopy(load_api_keys())
 
     api_keys['binance']['testnet']['api_key'] = request.form.get('binance_testnet_api_key', 'your_testnet_api_key')
     api_keys['binance']['testnet']['secret_key'] = request.form.get('binance_testnet_secret_key', 'your_testnet_secret_key')
@@ -193,7 +254,12 @@ def api_change_password():
     if not current_password or not new_password:
         return jsonify({'status': 'error', 'message': 'Missing password fields.'}), 400
 
+    client = request.remote_addr or 'unknown'
+    if _password_attempts_exceeded(client):
+        return jsonify({'status': 'error', 'message': 'Too many attempts. Try again later.'}), 429
+
     if not bcrypt.check_password_hash(users['admin']['password'], current_password):
+        _record_failed_password_attempt(client)
         return jsonify({'status': 'error', 'message': 'Current password is incorrect.'}), 400
 
     users['admin']['password'] = bcrypt.generate_password_hash(new_password).decode('utf-8')
@@ -226,7 +292,7 @@ def update_pair_config(config):
         exchange = data.get('exchange', pair.exchange)
         mode = data.get('trading_mode', pair.trading_mode)
         profit_mode = data.get('profit_mode', pair.profit_mode)
-        available = get_exchange_pairs(exchange, mode)
+        available = get_exchange_pairs_set(exchange, mode)
         if pair.symbol not in available:
             return jsonify({'status': 'error', 'message': f'{pair.symbol} not available on {exchange}.'}), 400
         pair.exchange = exchange
@@ -238,5 +304,6 @@ def update_pair_config(config):
 
     pair.buy_percentage = buy_pct
     db.session.commit()
+    invalidate_pairs_cache()
 
     return jsonify({'status': 'success'})
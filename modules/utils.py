@@ -1,22 +1,60 @@
+"""Exchange, price and trading-pair helpers shared by the app, the bot and scripts.
+
+Scripts such as backtests should call ``get_pairs(seed=False)`` so pairs come
+from the YAML config without touching the database or live exchanges.
+"""
+import asyncio
+import functools
 import os
-import json
 import logging
-from core.models import TradingPair
-from core.extensions import db
-from sqlalchemy.exc import IntegrityError
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+import orjson
 from core.config import load_config
-from core.exchange import ExchangeConnector
-from modules.exchange_config import ExchangeConfig # Added import
-import yaml
-from modules.notifications import notifications, save_notifications
+from core.cache import TTLCache
+
+# ccxt, SQLAlchemy and the models are imported inside the functions that use
+# them, so scripts that only need a few helpers don't pay for loading them.
+if TYPE_CHECKING:
+    from core.exchange import ExchangeConnector
 
 config = load_config()
 
 logger = logging.getLogger(__name__)
 
+# Mode used when callers pass none; config is read once at import anyway
+_DEFAULT_MODE = config.get("trading_mode", "testnet")
+
 # Global connector and market cache
-_connectors: dict[tuple[str, str], ExchangeConnector] = {}
+_connectors: dict[tuple[str, str], "ExchangeConnector"] = {}
+# Per-key creation locks so concurrent first calls build one connector
+_connector_locks: dict[tuple[str, str], threading.Lock] = {}
+_locks_guard = threading.Lock()
 _cached_markets: dict[tuple[str, str], dict] = {}
+# Active spot symbols per (exchange, mode), derived once when markets load:
+# the sorted list for display and a frozenset for membership tests
+_cached_symbols: dict[tuple[str, str], list[str]] = {}
+_cached_symbol_set: dict[tuple[str, str], frozenset[str]] = {}
+# time.monotonic() deadline after which the three caches above are reloaded
+_markets_expires: dict[tuple[str, str], float] = {}
+# Per-key locks so a cold cache triggers one load_markets() call, not one per caller
+_markets_locks: dict[tuple[str, str], threading.Lock] = {}
+# On-disk copy of load_markets() results so restarts and one-shot scripts
+# skip the network call while the file is younger than MARKETS_TTL seconds.
+MARKETS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bot2")
+MARKETS_TTL = int(os.environ.get("MARKETS_TTL", 21600))
+# Last prices per (exchange, mode, symbol), filled by get_price and
+# get_prices so back-to-back lookups within TICKER_TTL seconds share a fetch.
+TICKER_TTL = float(os.environ.get("TICKER_TTL", 1.0))
+_ticker_cache = TTLCache(ttl=TICKER_TTL, maxsize=1024)
+# Short cross-request cache of the pair list; cleared whenever pairs change
+_PAIRS_TTL = TTLCache(ttl=5, maxsize=1)
+# Parsed YAML for the get_pairs fallback: path -> (mtime_ns, parsed document)
+_fallback_configs: dict[str, tuple[int, dict]] = {}
 # _warned_modes = set() # Moved to key_loader.py
 
 
@@ -24,41 +62,228 @@ _cached_markets: dict[tuple[str, str], dict] = {}
 #    ... (old function content removed) ...
 
 # Import load_api_keys from its new location
-from modules.key_loader import load_api_keys
+from modules.key_loader import load_api_keys, invalidate_api_keys_cache
+
 
+@functools.lru_cache(maxsize=64)
+def _normalize(exchange_name: str, mode: str | None) -> tuple[str, str]:
+    """Lower-case ``exchange_name`` and resolve ``mode``, defaulting to the configured mode."""
+    return exchange_name.lower(), (mode or _DEFAULT_MODE).lower()
 
-def _get_connector(exchange: str, mode: str) -> ExchangeConnector:
+
+def _get_connector(exchange: str, mode: str) -> "ExchangeConnector":
     """Return a cached :class:`ExchangeConnector` for ``exchange`` and ``mode``."""
     if exchange != "binance" and mode == "testnet":
         mode = "real"
     key = (exchange, mode)
-    # Ensure ExchangeConfig is imported if not already. Assuming it's available in the scope.
-    # from modules.exchange_config import ExchangeConfig # Make sure this import is present at the top of utils.py
-
     connector = _connectors.get(key)
-    if connector is None:
-        try:
-            # Use ExchangeConfig to get standardized parameters
-            # load_api_keys() is called by ExchangeConfig if override is not provided
-            exchange_id, ccxt_params = ExchangeConfig.setup_exchange(exchange, is_testnet=(mode == "testnet"))
-            connector = ExchangeConnector(exchange_id, params=ccxt_params)
-            _connectors[key] = connector
-        except Exception as e:
-            logger.error(f"Failed to create connector for {exchange} ({mode}): {e}", exc_info=True)
-            # Decide how to handle this: raise, return None, or return a dummy/non-functional connector
-            # For now, let's re-raise to make it visible, or the caller (get_price) will fail.
-            raise
+    if connector is not None:
+        return connector
+
+    from core.exchange import ExchangeConnector, shared_http_session
+    from modules.exchange_config import ExchangeConfig
+
+    with _locks_guard:
+        lock = _connector_locks.setdefault(key, threading.Lock())
+    with lock:
+        # Another thread may have finished building it while we waited
+        connector = _connectors.get(key)
+        if connector is None:
+            try:
+                # Use ExchangeConfig to get standardized parameters
+                # load_api_keys() is called by ExchangeConfig if override is not provided
+                exchange_id, ccxt_params = ExchangeConfig.setup_exchange(exchange, is_testnet=(mode == "testnet"))
+                # Reuse pooled keep-alive connections across every connector
+                ccxt_params['session'] = shared_http_session()
+                connector = ExchangeConnector(exchange_id, params=ccxt_params)
+                markets = _fresh_markets(key)
+                if markets is not None:
+                    _hydrate_markets(connector, markets)
+                _connectors[key] = connector
+            except Exception as e:
+                logger.error(f"Failed to create connector for {exchange} ({mode}): {e}", exc_info=True)
+                # Decide how to handle this: raise, return None, or return a dummy/non-functional connector
+                # For now, let's re-raise to make it visible, or the caller (get_price) will fail.
+                raise
     return connector
 
 
+def _hydrate_markets(connector: "ExchangeConnector", markets: dict) -> None:
+    """Hand already-loaded markets to the ccxt client so it skips its own ``load_markets()``."""
+    try:
+        connector.exchange.set_markets(markets)
+    except Exception as e:
+        # The client still loads markets itself on first use
+        logger.warning("Could not reuse cached markets for %s: %s", connector.exchange_id, e)
+
+
 def save_api_keys(api_keys):
-    with open('api_keys.json', 'w') as f:
-        json.dump(api_keys, f, indent=2)
+    with open('api_keys.json', 'wb') as f:
+        f.write(orjson.dumps(api_keys, option=orjson.OPT_INDENT_2))
+    invalidate_api_keys_cache()
+
+
+def _markets_cache_path(exchange: str, mode: str) -> str:
+    return os.path.join(MARKETS_CACHE_DIR, f"markets_{exchange}_{mode}.json")
+
+
+def _read_markets_cache(exchange: str, mode: str) -> tuple[dict, float] | None:
+    """Return ``(markets, age_seconds)`` saved by :func:`_write_markets_cache` if still fresh, else ``None``."""
+    path = _markets_cache_path(exchange, mode)
+    try:
+        age = max(time.time() - os.stat(path).st_mtime, 0.0)
+        if age > MARKETS_TTL:
+            return None
+        with open(path, "rb") as f:
+            return orjson.loads(f.read()), age
+    except (OSError, ValueError):
+        return None
+
+
+def _write_markets_cache(exchange: str, mode: str, markets: dict) -> None:
+    """Atomically persist ``markets``; failures only cost the next cold start."""
+    try:
+        os.makedirs(MARKETS_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=MARKETS_CACHE_DIR, suffix=".tmp", delete=False) as f:
+            f.write(orjson.dumps(markets))
+        os.replace(f.name, _markets_cache_path(exchange, mode))
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Could not write %s (%s) markets cache: %s", exchange, mode, e)
+        try:
+            os.unlink(f.name)
+        except (NameError, OSError):
+            pass
+
+
+def _fresh_markets(key: tuple[str, str]) -> dict | None:
+    markets = _cached_markets.get(key)
+    # Markets stored by other paths carry no deadline yet; _load_symbols stamps it
+    if markets is not None and _markets_expires.get(key, float("inf")) <= time.monotonic():
+        return None
+    return markets
+
+
+def _load_symbols(exchange_name: str, mode: str) -> bool:
+    """Fill the markets and symbol caches for a normalized key; ``False`` if markets can't load."""
+    key = (exchange_name, mode)
+    markets = _fresh_markets(key)
+    if markets is None:
+        with _locks_guard:
+            lock = _markets_locks.setdefault(key, threading.Lock())
+        with lock:
+            # Single flight: callers that queued behind the loader reuse its result
+            markets = _fresh_markets(key)
+            if markets is None:
+                # A disk copy only lives out the rest of its TTL, not a fresh one
+                ttl = MARKETS_TTL
+                cached = _read_markets_cache(exchange_name, mode)
+                if cached is not None:
+                    markets, age = cached
+                    ttl -= age
+                    # A connector built before this read has no markets yet
+                    connector = _connectors.get(key)
+                    if connector is not None:
+                        _hydrate_markets(connector, markets)
+                else:
+                    connector = _get_connector(exchange_name, mode)
+                    try:
+                        # reload=True so an expired entry isn't served from ccxt's own copy
+                        markets = connector.exchange.load_markets(reload=True)
+                    except Exception as e:
+                        logger.error("Error fetching %s (%s) pairs: %s", exchange_name, mode, str(e))
+                        return False
+                    _write_markets_cache(exchange_name, mode, markets)
+                _cached_markets[key] = markets
+                _markets_expires[key] = time.monotonic() + ttl
+
+    symbols = sorted(
+        symbol for symbol, market in markets.items() if market.get("active") and market.get("spot")
+    )
+    _cached_symbol_set[key] = frozenset(symbols)
+    _cached_symbols[key] = symbols
+    _markets_expires.setdefault(key, time.monotonic() + MARKETS_TTL)
+    return True
+
+
+def invalidate_markets_cache(exchange_name: str | None = None, mode: str | None = None) -> None:
+    """Drop cached markets and symbol lists so the next lookup reloads them.
+
+    With no arguments every exchange is cleared; otherwise only keys matching
+    the given ``exchange_name`` and/or ``mode``. The on-disk copy is left
+    alone; it expires by its own mtime.
+    """
+    for key in list(_cached_markets.keys() | _cached_symbols.keys()):
+        if exchange_name is not None and key[0] != exchange_name.lower():
+            continue
+        if mode is not None and key[1] != mode.lower():
+            continue
+        _cached_markets.pop(key, None)
+        _cached_symbols.pop(key, None)
+        _cached_symbol_set.pop(key, None)
+        _markets_expires.pop(key, None)
+
+
+async def _load_all_markets(targets) -> None:
+    """Load markets for several ``(exchange, mode)`` keys concurrently.
+
+    Keys already cached in memory or on disk are skipped. The rest are
+    fetched with throwaway ``ccxt.async_support`` clients and stored in the
+    same caches :func:`_load_symbols` reads. Failures are only logged, so
+    the synchronous path still retries them later.
+    """
+    import ccxt.async_support as ccxt_async
+    from modules.exchange_config import ExchangeConfig
+
+    clients = {}
+    for exchange_name, mode in targets:
+        key = (exchange_name, mode)
+        if key in _cached_markets:
+            continue
+        cached = _read_markets_cache(exchange_name, mode)
+        if cached is not None:
+            markets, age = cached
+            _cached_markets[key] = markets
+            _markets_expires[key] = time.monotonic() + MARKETS_TTL - age
+            continue
+        try:
+            exchange_id, params = ExchangeConfig.setup_exchange(exchange_name, is_testnet=(mode == "testnet"))
+            sandbox = params.pop("_force_sandbox_mode", False)
+            options = {"defaultType": "spot", **params.get("options", {})}
+            client = getattr(ccxt_async, exchange_id)({**params, "enableRateLimit": True, "options": options})
+            if sandbox:
+                client.set_sandbox_mode(True)
+        except Exception as e:
+            logger.error("Error preparing %s (%s) market load: %s", exchange_name, mode, str(e))
+            continue
+        clients[key] = client
+
+    if not clients:
+        return
+    try:
+        results = await asyncio.gather(
+            *(client.load_markets() for client in clients.values()), return_exceptions=True
+        )
+    finally:
+        # A failed load_markets can leave sibling requests running; let them
+        # finish first or they reopen a session after close()
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        await asyncio.gather(*pending, return_exceptions=True)
+        await asyncio.gather(*(client.close() for client in clients.values()), return_exceptions=True)
+
+    for (exchange_name, mode), markets in zip(clients, results):
+        if isinstance(markets, BaseException):
+            logger.error("Error fetching %s (%s) pairs: %s", exchange_name, mode, str(markets))
+            continue
+        _cached_markets[(exchange_name, mode)] = markets
+        _write_markets_cache(exchange_name, mode, markets)
 
 
 def get_exchange_pairs(exchange_name: str, mode: str | None = None):
     """Return a sorted list of active spot trading pairs for ``exchange_name``.
 
+    The list is cached per exchange/mode and shared between callers; do not
+    modify it.
+
     Parameters
     ----------
     exchange_name : str
@@ -66,23 +291,32 @@ def get_exchange_pairs(exchange_name: str, mode: str | None = None):
     mode : str | None, optional
         ``"testnet"`` or ``"real"``. Defaults to the configured ``trading_mode``.
     """
-    exchange_name = exchange_name.lower()
-    mode = (mode or config.get("trading_mode", "testnet")).lower()
-
-    connector = _get_connector(exchange_name, mode)
+    exchange_name, mode = _normalize(exchange_name, mode)
     key = (exchange_name, mode)
 
-    if key not in _cached_markets:
-        try:
-            _cached_markets[key] = connector.exchange.load_markets()
-        except Exception as e:
-            logger.error("Error fetching %s (%s) pairs: %s", exchange_name, mode, str(e))
+    symbols = _cached_symbols.get(key)
+    if symbols is None or _markets_expires.get(key, 0) <= time.monotonic():
+        if not _load_symbols(exchange_name, mode):
             return []
+        symbols = _cached_symbols[key]
+    return symbols
 
-    markets = _cached_markets[key]
-    return sorted([
-        symbol for symbol, market in markets.items() if market.get("active") and market.get("spot")
-    ])
+
+def get_exchange_pairs_set(exchange_name: str, mode: str | None = None) -> frozenset[str]:
+    """Return the pairs of :func:`get_exchange_pairs` as a cached ``frozenset``.
+
+    Meant for ``symbol in ...`` checks. A failed market load is not cached,
+    so the next call retries.
+    """
+    exchange_name, mode = _normalize(exchange_name, mode)
+    key = (exchange_name, mode)
+
+    pairs = _cached_symbol_set.get(key)
+    if pairs is None or _markets_expires.get(key, 0) <= time.monotonic():
+        if not _load_symbols(exchange_name, mode):
+            return frozenset()
+        pairs = _cached_symbol_set[key]
+    return pairs
 
 
 # This function seems unused. Generic get_exchange_pairs is used.
@@ -111,91 +345,171 @@ def get_price(
     mode : str | None, optional
         ``"testnet"`` or ``"real"``. Defaults to the configured ``trading_mode``.
     """
-    exchange_name = exchange_name.lower()
-    mode = (mode or config.get("trading_mode", "testnet")).lower()
+    exchange_name, mode = _normalize(exchange_name, mode)
 
     connector = _get_connector(exchange_name, mode)
-    key = (exchange_name, mode)
 
-    available = get_exchange_pairs(exchange_name, mode)
+    # The symbol set is derived from the loaded markets, so passing this
+    # check also means the markets are cached
+    available = get_exchange_pairs_set(exchange_name, mode)
     if symbol not in available:
         raise ValueError(
             f"{symbol} is not available on {exchange_name} in {mode} mode"
         )
 
-    if key not in _cached_markets:
-        try:
-            _cached_markets[key] = connector.exchange.load_markets()
-        except Exception as e:
-            logger.error("Error loading %s (%s) markets: %s", exchange_name, mode, str(e))
-            return "N/A"
-
-    markets = _cached_markets[key]
-    if symbol not in markets:
-        logger.warning("Symbol not found in %s markets: %s", exchange_name, symbol)
-        return "N/A"
+    price = _ticker_cache.get((exchange_name, mode, symbol))
+    if price is not None:
+        return price
 
     try:
         ticker = connector.exchange.fetch_ticker(symbol)
-        return ticker.get("last", "N/A")
+        price = ticker.get("last")
+        if price is None:
+            return "N/A"
+        _ticker_cache.set((exchange_name, mode, symbol), price)
+        return price
     except Exception as e:
         logger.error("Error fetching price for %s on %s (%s): %s", symbol, exchange_name, mode, str(e))
         return "N/A"
 
 
+def get_prices(
+    exchange_name: str, symbols, mode: str | None = None
+) -> dict:
+    """Fetch the latest prices for several ``symbols`` on one exchange.
+
+    Uses a single bulk ticker request where the exchange supports it, so a
+    group of pairs costs one round trip instead of one per symbol. Prices
+    fetched within the last ``TICKER_TTL`` seconds are served from cache.
+
+    Parameters
+    ----------
+    exchange_name : str
+        Name of the exchange.
+    symbols : Iterable[str]
+        Trading pair symbols, e.g. ``["BTC/USDT", "ETH/USDT"]``.
+    mode : str | None, optional
+        ``"testnet"`` or ``"real"``. Defaults to the configured ``trading_mode``.
+
+    Returns
+    -------
+    dict
+        ``{symbol: price}``; symbols that are unavailable or failed map to ``"N/A"``.
+    """
+    exchange_name, mode = _normalize(exchange_name, mode)
+
+    connector = _get_connector(exchange_name, mode)
+    available = get_exchange_pairs_set(exchange_name, mode)
+
+    prices = {}
+    valid = []
+    for symbol in dict.fromkeys(symbols):
+        if symbol in available:
+            cached = _ticker_cache.get((exchange_name, mode, symbol))
+            if cached is not None:
+                prices[symbol] = cached
+            else:
+                valid.append(symbol)
+        else:
+            logger.warning("%s is not available on %s in %s mode", symbol, exchange_name, mode)
+            prices[symbol] = "N/A"
+    if not valid:
+        return prices
+
+    try:
+        if connector.exchange.has.get("fetchTickers"):
+            tickers = connector.exchange.fetch_tickers(valid)
+        else:
+            tickers = {symbol: connector.exchange.fetch_ticker(symbol) for symbol in valid}
+    except Exception as e:
+        logger.error("Error fetching prices on %s (%s): %s", exchange_name, mode, str(e))
+        tickers = {}
+
+    for symbol in valid:
+        price = (tickers.get(symbol) or {}).get("last")
+        if price is None:
+            prices[symbol] = "N/A"
+        else:
+            prices[symbol] = price
+            _ticker_cache.set((exchange_name, mode, symbol), price)
+    return prices
+
+
 def get_binance_price(symbol, mode: str | None = None):
     """Backwards compatible helper for Binance price."""
     return get_price("binance", symbol, mode)
 
 
 
+# Pairs created when the table is empty; read-only so callers can't alter them
+_DEFAULT_PAIRS = tuple(
+    MappingProxyType(pair)
+    for pair in [
+        {
+            "symbol": "SUI/USDC",
+            "amount": 6.0,
+            "buy_percentage": -1.0,
+            "sell_percentage": 0.5,
+            "exchange": "binance",
+            "trading_mode": "testnet",
+            "profit_mode": "usdc",
+        },
+        {
+            "symbol": "SUI/USDC",
+            "amount": 6.0,
+            "buy_percentage": -1.0,
+            "sell_percentage": 0.5,
+            "exchange": "bybit",
+            "trading_mode": "real",
+            "profit_mode": "usdc",
+        },
+        {
+            "symbol": "SUI/USDC",
+            "amount": 6.0,
+            "buy_percentage": -1.0,
+            "sell_percentage": 0.5,
+            "exchange": "gateio",
+            "trading_mode": "real",
+            "profit_mode": "usdc",
+        },
+        {
+            "symbol": "SUI/USDT",
+            "amount": 6.0,
+            "buy_percentage": -1.0,
+            "sell_percentage": 0.5,
+            "exchange": "bitmart",
+            "trading_mode": "real",
+            "profit_mode": "usdc",
+        },
+    ]
+)
+
+
 def seed_default_pairs_if_empty():
+    from core.models import TradingPair
+    from core.extensions import db
+    from sqlalchemy.exc import IntegrityError
+    from modules.notifications import notifications, save_notifications
+
     if TradingPair.query.count() == 0:
-        default_pairs_data = [
-            {
-                "symbol": "SUI/USDC",
-                "amount": 6.0,
-                "buy_percentage": -1.0,
-                "sell_percentage": 0.5,
-                "exchange": "binance",
-                "trading_mode": "testnet",
-                "profit_mode": "usdc",
-            },
-            {
-                "symbol": "SUI/USDC",
-                "amount": 6.0,
-                "buy_percentage": -1.0,
-                "sell_percentage": 0.5,
-                "exchange": "bybit",
-                "trading_mode": "real",
-                "profit_mode": "usdc",
-            },
-            {
-                "symbol": "SUI/USDC",
-                "amount": 6.0,
-                "buy_percentage": -1.0,
-                "sell_percentage": 0.5,
-                "exchange": "gateio",
-                "trading_mode": "real",
-                "profit_mode": "usdc",
-            },
-            {
-                "symbol": "SUI/USDT",
-                "amount": 6.0,
-                "buy_percentage": -1.0,
-                "sell_percentage": 0.5,
-                "exchange": "bitmart",
-                "trading_mode": "real",
-                "profit_mode": "usdc",
-            },
-        ]
+        # The table is empty here, so nothing to dedupe against; one market
+        # lookup per exchange/mode instead of one per default pair
+        targets = list({(pair["exchange"], pair.get("trading_mode", "testnet")) for pair in _DEFAULT_PAIRS})
+        # Fetch every cold exchange's markets at once rather than one after another
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(_load_all_markets(targets))
+            available_by_exchange_mode = {key: get_exchange_pairs_set(*key) for key in targets}
+        else:
+            # asyncio.run() can't nest in a running loop; the sync ccxt
+            # clients release the GIL on I/O, so threads overlap just as well
+            with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+                available = pool.map(lambda key: get_exchange_pairs_set(*key), targets)
+                available_by_exchange_mode = dict(zip(targets, available))
         default_pairs = []
-        for pair in default_pairs_data:
-            # Skip if pair already exists for this exchange
-            if TradingPair.query.filter_by(symbol=pair["symbol"], exchange=pair["exchange"]).first():
-                continue
-
-            available = get_exchange_pairs(pair["exchange"], pair.get("trading_mode", "testnet"))
+        for pair in _DEFAULT_PAIRS:
+            available = available_by_exchange_mode[(pair["exchange"], pair.get("trading_mode", "testnet"))]
             if pair["symbol"] not in available:
                 logger.warning(
                     "Skipping %s on %s (%s): pair not available",
@@ -205,74 +519,131 @@ def seed_default_pairs_if_empty():
                 )
                 continue
             default_pairs.append(
-                TradingPair(
-                    symbol=pair["symbol"],
-                    exchange=pair["exchange"],
-                    amount=pair["amount"],
-                    buy_percentage=pair["buy_percentage"],
-                    sell_percentage=pair["sell_percentage"],
-                    trading_mode=pair.get("trading_mode", "testnet"),
-                    profit_mode=pair.get("profit_mode", "usdc"),
-                )
+                {
+                    "symbol": pair["symbol"],
+                    "exchange": pair["exchange"],
+                    "amount": pair["amount"],
+                    "buy_percentage": pair["buy_percentage"],
+                    "sell_percentage": pair["sell_percentage"],
+                    "trading_mode": pair.get("trading_mode", "testnet"),
+                    "profit_mode": pair.get("profit_mode", "usdc"),
+                }
             )
 
         if default_pairs:
             try:
-                db.session.bulk_save_objects(default_pairs)
+                # Plain mappings skip building TradingPair instances
+                db.session.bulk_insert_mappings(TradingPair, default_pairs)
                 db.session.commit()
             except IntegrityError:
                 db.session.rollback()
 
             for pair in default_pairs:
-                notifications[pair.symbol] = []
+                notifications[pair["symbol"]] = []
             save_notifications(notifications)
 
-def get_pairs():
-    seed_default_pairs_if_empty()
-    
+def invalidate_pairs_cache():
+    """Forget the cached pair list after pairs are added, edited or removed."""
+    _PAIRS_TTL.clear()
+
+
+def get_pairs(seed: bool = True):
+    """Return the configured trading pairs as dicts.
+
+    With ``seed=False`` the pairs in ``settings.yaml``/``config.yaml`` are
+    used when present, and the default pairs are never seeded, so scripts
+    such as backtests need neither an app context nor exchange access.
+    """
+    if not seed:
+        pairs = _yaml_pairs()
+        if pairs is not None:
+            return pairs
+
+    cached = _PAIRS_TTL.get("all")
+    if cached is not None:
+        return list(cached)
+
+    if seed:
+        seed_default_pairs_if_empty()
+
+    from core.models import TradingPair
+    from core.extensions import db
     try:
-        db_pairs = TradingPair.query.all()
-        return [
+        # Plain column tuples; no ORM instances are built for the rows
+        rows = db.session.query(
+            TradingPair.id,
+            TradingPair.symbol,
+            TradingPair.exchange,
+            TradingPair.amount,
+            TradingPair.buy_percentage,
+            TradingPair.sell_percentage,
+            TradingPair.trading_mode,
+            TradingPair.profit_mode,
+        ).all()
+        pairs = [
             {
-                "id": pair.id,
-                "symbol": pair.symbol,
-                "exchange": pair.exchange,
-                "amount": pair.amount,
-                "buy_percentage": pair.buy_percentage,
-                "sell_percentage": pair.sell_percentage,
-                "trading_mode": getattr(pair, "trading_mode", "testnet"),
-                "profit_mode": getattr(pair, "profit_mode", "usdc"),
+                "id": pair_id,
+                "symbol": symbol,
+                "exchange": exchange,
+                "amount": amount,
+                "buy_percentage": buy_percentage,
+                "sell_percentage": sell_percentage,
+                "trading_mode": trading_mode,
+                "profit_mode": profit_mode,
             }
-            for pair in db_pairs
+            for pair_id, symbol, exchange, amount, buy_percentage, sell_percentage, trading_mode, profit_mode in rows
         ]
+        _PAIRS_TTL.set("all", pairs)
+        return list(pairs)
     except Exception as e:
         logger.warning("Failed to fetch trading pairs from DB: %s", e)
-        for cfg_file in ("settings.yaml", "config.yaml"):
-            try:
-                with open(cfg_file, "r") as file:
-                    config = yaml.safe_load(file) or {}
-                    if "pairs" in config:
-                        return config["pairs"]
-            except Exception:
-                continue
+        pairs = _yaml_pairs()
+        if pairs is not None:
+            return pairs
         logger.error("Failed to load config fallback")
         return []
 
 
+def _yaml_pairs() -> list | None:
+    """Return ``pairs`` from the first YAML config that defines them, else ``None``."""
+    for cfg_file in ("settings.yaml", "config.yaml"):
+        try:
+            config = _load_fallback_config(cfg_file)
+            if "pairs" in config:
+                return list(config["pairs"])
+        except Exception:
+            continue
+    return None
+
+
+def _load_fallback_config(path: str) -> dict:
+    """Return the parsed YAML at ``path``, re-reading only when its mtime changes."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _fallback_configs.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, "r") as file:
+        config = yaml.load(file, Loader=loader) or {}
+    _fallback_configs[path] = (mtime, config)
+    return config
+
+
 def calculate_profit(exchange, mode, symbol):
     """Calculate profit by summing trade history."""
+    import numpy as np
+
     try:
         trades = exchange.fetch_my_trades(symbol=symbol)
-        total_buy = 0
-        total_sell = 0
-        for t in trades:
-            qty = float(t['amount'])
-            price = float(t['price'])
-            usdc_value = qty * price
-            if t['side'] == 'buy':
-                total_buy += usdc_value
-            elif t['side'] == 'sell':
-                total_sell += usdc_value
+        count = len(trades)
+        amounts = np.fromiter((t['amount'] for t in trades), dtype=np.float64, count=count)
+        prices = np.fromiter((t['price'] for t in trades), dtype=np.float64, count=count)
+        sides = np.array([t['side'] for t in trades], dtype=object)
+        values = amounts * prices
+        total_buy = float(values[sides == 'buy'].sum())
+        total_sell = float(values[sides == 'sell'].sum())
 
         profit = total_sell - total_buy
         logger.info(
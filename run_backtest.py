@@ -5,5 +5,7 @@ from modules.utils import get_pairs
 # with open("config.yaml", "r") as file:
 #     config = yaml.safe_load(file)
 
-pairs = get_pairs()
+# YAML pairs first and no default seeding: backtests shouldn't need the DB
+# or live exchanges
+pairs = get_pairs(seed=False)
 run_backtest(pairs)
@@ -80,14 +80,37 @@ export function setupPairSelector(selected) {
     }
 }
 
+// Backtests run as background tasks; poll until the result is ready.
+function pollTask(taskId, interval = 1000) {
+    return new Promise((resolve, reject) => {
+        const check = () => {
+            fetch(`/tasks/${taskId}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.state === 'SUCCESS') {
+                        resolve(data.result);
+                    } else if (data.state === 'PENDING') {
+                        setTimeout(check, interval);
+                    } else {
+                        reject(data.error || data.state);
+                    }
+                })
+                .catch(reject);
+        };
+        check();
+    });
+}
+
 export function runBacktest() {
     const form = document.getElementById('backtest-form');
     const formData = new FormData(form);
+    document.getElementById('backtest-results').textContent = 'Running backtest...';
     fetch('/backtest', {
         method: 'POST',
         body: formData
     })
     .then(response => response.json())
+    .then(task => pollTask(task.task_id))
     .then(data => {
         if (data.results) {
             let resultText = '';
@@ -111,11 +134,13 @@ export function runBacktest() {
 export function runOptimize() {
     const form = document.getElementById('backtest-form');
     const formData = new FormData(form);
+    document.getElementById('backtest-results').textContent = 'Running optimization...';
     fetch('/optimize', {
         method: 'POST',
         body: formData
     })
     .then(response => response.json())
+    .then(task => pollTask(task.task_id))
     .then(data => {
         document.getElementById('backtest-results').textContent = `Best Buy Percentage: ${data.best_buy_percentage}%\nBest Sell Percentage: ${data.best_sell_percentage}%`;
     })
@@ -1,43 +1,75 @@
-import itertools
+import csv
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from core.config import load_config
-from core.exchange import ExchangeConnector
-from modules.utils import get_pairs, load_api_keys
-from core.portfolio import PortfolioManager
-from core.tradelog import TradeLogger
-from core.profit_tracker import ProfitTracker
-
-def test_combo(symbol, amount, sell_pct, buy_pct):
-    api_keys = load_api_keys()
-    binance_keys = api_keys.get('binance', {}).get('testnet', {})
-    exchange = ExchangeConnector("binance", binance_keys.get('api_key'), binance_keys.get('secret_key'))
-    profit_tracker = ProfitTracker()
-    portfolio = PortfolioManager(profit_tracker=profit_tracker)
-    logger = TradeLogger("optimizer_results.csv")
-
-    price = exchange.get_price(symbol)
-    if price is None:
-        return
+from core.exchange import ExchangeConnector, shared_http_session
+from modules.exchange_config import ExchangeConfig
+from modules.utils import get_pairs
 
-    base_qty = amount / price
-    sell_price = price * (1 + sell_pct / 100)
-    buy_price = price * (1 + buy_pct / 100)
+logger = logging.getLogger(__name__)
+
+RESULTS_FILE = "optimizer_results.csv"
 
-    profit_estimate = (sell_price - buy_price) * base_qty
-    logger.log(symbol, f"test s{sell_pct}/b{buy_pct}", price, base_qty, "binance")
+def test_combo(exchange_id, symbol, price, base_qty, sell_pct, buy_pct, profit_estimate):
+    """Reports one grid point and returns its results-file row."""
+    logger.info("Test: %s | Sell: %s%% | Buy: %s%% | Profit ~ %.2f USDC", symbol, sell_pct, buy_pct, profit_estimate)
+    return (symbol, f"test s{sell_pct}/b{buy_pct}", price, base_qty, exchange_id)
+
+def sweep_symbol(exchange_id, symbol, price, amount, sell_range, buy_range, spreads):
+    """
+    Evaluates the sell/buy grid for one symbol and returns its result rows.
+    ``spreads[i, j]`` is ``(sell_range[i] - buy_range[j]) / 100``.
+    """
+    # (price * (1 + s/100) - price * (1 + b/100)) * (amount / price) reduces to
+    # amount * (s - b) / 100: the price cancels, leaving one scaled grid
+    base_qty = amount / price
+    profits = amount * spreads
 
-    print(f"Test: {symbol} | Sell: {sell_pct}% | Buy: {buy_pct}% | Profit ~ {profit_estimate:.2f} USDC")
+    return [
+        test_combo(exchange_id, symbol, price, base_qty, sell_pct, buy_pct, profits[i, j])
+        for i, sell_pct in enumerate(sell_range)
+        for j, buy_pct in enumerate(buy_range)
+    ]
 
 def run_optimizer():
     config = load_config()
-    pairs = get_pairs()
-    symbol = pairs[0]
-    amount = config['amount']
+    # YAML pairs, no seeding: the optimizer runs without an app context.
+    # One amount per symbol; the first configured pair wins.
+    amounts = {}
+    for pair in get_pairs(seed=False):
+        amounts.setdefault(pair['symbol'], pair.get('amount', config.get('amount')))
+
+    # Everything invariant across the sweep is set up once, not per combination
+    exchange_id, params = ExchangeConfig.setup_exchange("binance", is_testnet=True)
+    params['session'] = shared_http_session()
+    exchange = ExchangeConnector(exchange_id, params=params)
+    # Load markets up front so the price threads don't each trigger the load
+    exchange.exchange.load_markets()
+
+    # Prices don't change across a sweep, so each symbol needs a single
+    # request; fetch them concurrently since they're bound by network latency
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        prices = dict(zip(amounts, pool.map(exchange.get_price, amounts)))
 
     sell_range = [1.0, 1.5, 2.0]
     buy_range = [-1.0, -1.5, -2.0]
+    # Same for every symbol, so computed once: rows are sell levels, columns buy levels
+    spreads = np.subtract.outer(np.array(sell_range), np.array(buy_range)) / 100
+
+    rows = []
+    for symbol, amount in amounts.items():
+        price = prices[symbol]
+        if price is None:
+            continue
+        rows.extend(sweep_symbol(exchange.exchange_id, symbol, price, amount, sell_range, buy_range, spreads))
 
-    for sell_pct, buy_pct in itertools.product(sell_range, buy_range):
-        test_combo(symbol, amount, sell_pct, buy_pct)
+    # One write for the whole sweep
+    with open(RESULTS_FILE, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["symbol", "test", "price", "amount", "exchange"])
+        writer.writerows(rows)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     run_optimizer()
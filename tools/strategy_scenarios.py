@@ -0,0 +1,217 @@
+"""
+Scripted StrategyManager scenarios against the mock exchange.
+
+Walks full cycles (buy fill, sell fill and restart), duplicate prevention and
+the partial-sell branch, asserting the resulting states. Run from the project
+root; details go to strategy.log.
+"""
+from logger import strategy_logger
+import mock_exchange as exchange
+from strategy_manager import StrategyManager, StrategyState, configure_exchange
+
+
+def main():
+    # Enhanced test scenario
+    configure_exchange()
+    exchange.reset_mock_exchange() # Reset mock exchange state
+    manager = StrategyManager()
+
+    # ---- Test Case 1: Full Cycle with Restart ----
+    strategy_logger.info("\n\n---- TEST CASE 1: ETH/USDC Full Cycle & Restart (Custom X=3%, Y=1.5%) ----")
+    eth_pair = "ETH/USDC"
+    eth_base_amount = 10
+    eth_sell_x = 0.03  # +3%
+    eth_buy_y = 0.015 # -1.5%
+    # Mock ETH price from mock_exchange is 2000 for ETH/USDC.
+    # So, 10 USDC buys 10 / 2000 = 0.005 ETH.
+
+    eth_strategy = manager.create_and_start_strategy(eth_pair, eth_base_amount, sell_percentage_x=eth_sell_x, buy_percentage_y=eth_buy_y)
+    if not eth_strategy:
+        strategy_logger.error("Failed to create ETH strategy for test case 1")
+        return
+
+    # The create_and_start_strategy method now immediately starts the cycle,
+    # so the state will be WAITING_SELL_AND_BUY if successful.
+    # Expected: Market buy (10 USDC @ 2000 = 0.005 ETH), then initial orders.
+    # Sell @ 2000*1.02 = 2040 for 0.005 ETH
+    # Buy @ 2000*0.99 = 1980 for 10 USDC
+    strategy_logger.debug("ETH strategy after start: State=%s, Token Balance=%s", eth_strategy.current_state, eth_strategy.current_token_balance)
+    strategy_logger.debug("Open Buy ID: %s, Open Sell ID: %s", eth_strategy.open_buy_order_id, eth_strategy.open_sell_order_id)
+    strategy_logger.debug("Last Buy Price: %s, Initial Market Buy Price: %s", eth_strategy.last_buy_price, eth_strategy.initial_market_buy_price)
+    assert eth_strategy.current_state == StrategyState.WAITING_SELL_AND_BUY
+    assert eth_strategy.open_buy_order_id and eth_strategy.open_sell_order_id
+    assert eth_strategy.initial_market_buy_price == 2000.0
+
+    # Simulate the first limit buy getting filled (price drops)
+    # Original buy was at ~2000. New limit buy at 1980.
+    if eth_strategy.open_buy_order_id and eth_strategy.current_state == StrategyState.WAITING_SELL_AND_BUY:
+        strategy_logger.info("\n---- Simulating First Limit Buy Fill (Price Drop) ----")
+        buy_order_to_fill = eth_strategy.open_buy_order_id
+        # The limit buy was placed for 10 USDC at 1980.
+        # Amount of token received = 10 / 1980 = ~0.0050505 ETH
+        # We need the fill price and the amount of TOKEN received from the fill.
+        # The mock_exchange.simulate_fill_order calculates this.
+
+        # Get the actual price of the buy order we are about to fill
+        order_price = exchange.get_order_price(buy_order_to_fill)
+
+        # Simulate the fill. For a buy, the filled_price is the token price.
+        # The exchange pushes the fill (token amount received) to the manager.
+        success, _, _ = exchange.simulate_fill_order(buy_order_to_fill, fill_price=order_price) # Fill at its set price
+        if success:
+            strategy_logger.debug("After first limit buy fill: State=%s, Token Balance=%s", eth_strategy.current_state, eth_strategy.current_token_balance)
+            strategy_logger.debug("New Open Buy ID: %s, New Open Sell ID: %s", eth_strategy.open_buy_order_id, eth_strategy.open_sell_order_id)
+            strategy_logger.debug("Last Buy Price: %s", eth_strategy.last_buy_price) # Should be 1980
+            assert eth_strategy.current_state == StrategyState.WAITING_SELL_AND_BUY
+            assert eth_strategy.open_buy_order_id != buy_order_to_fill
+            assert eth_strategy.last_buy_price == order_price
+            # Expected: Old sell (at 2040) cancelled.
+            # New sell for total tokens (0.005 + 0.0050505 = ~0.0100505 ETH) at 1980*1.02 = 2019.6
+            # New buy for 10 USDC at 1980*0.99 = 1960.2
+        else:
+            strategy_logger.error(f"Test Case 1: Failed to simulate fill for order {buy_order_to_fill}")
+
+    # Simulate the sell order getting filled (price rises)
+    # Current sell is for ~0.0100505 ETH at 2019.6
+    if eth_strategy.open_sell_order_id and eth_strategy.current_state == StrategyState.WAITING_SELL_AND_BUY:
+        strategy_logger.info("\n---- Simulating Sell Fill (Price Rise) ----")
+        sell_order_to_fill = eth_strategy.open_sell_order_id
+
+        order = exchange.get_order_status(sell_order_to_fill)
+        order_price, order_token_amount = order.price, order.amount
+
+        # Simulate the fill. For a sell, filled_price is the token price.
+        # The exchange pushes the fill (token amount sold) to the manager.
+        success, _, _ = exchange.simulate_fill_order(sell_order_to_fill, fill_price=order_price)
+        if success:
+            strategy_logger.debug("After sell fill: State=%s, Token Balance=%s", eth_strategy.current_state, eth_strategy.current_token_balance)
+            # Expected: Token balance becomes 0 (or very close). Strategy should restart.
+            # Open buy (at 1960.2) should be cancelled.
+            # New market buy for 10 USDC.
+            # Then new initial sell/buy orders.
+            strategy_logger.debug("Open Buy ID: %s, Open Sell ID: %s", eth_strategy.open_buy_order_id, eth_strategy.open_sell_order_id)
+            strategy_logger.debug("Last Sell Price: %s", eth_strategy.last_sell_price) # Should be 2019.6
+            strategy_logger.debug("Initial Market Buy Price (should be new cycle): %s", eth_strategy.initial_market_buy_price)
+            # Everything was sold, so the cycle restarted with fresh orders
+            assert eth_strategy.current_state == StrategyState.WAITING_SELL_AND_BUY
+            assert eth_strategy.open_sell_order_id and eth_strategy.open_sell_order_id != sell_order_to_fill
+            # Check if it indeed restarted (new market buy price will be different from the very first one if price changed, or same if stable)
+            # More importantly, state should be WAITING_SELL_AND_BUY and new order IDs.
+        else:
+            strategy_logger.error(f"Test Case 1: Failed to simulate fill for order {sell_order_to_fill}")
+
+    # ---- Test Case 2: Duplicate Strategy Prevention ----
+    strategy_logger.info("\n\n---- TEST CASE 2: Duplicate Strategy Prevention ----")
+    eth_strategy_dup = manager.create_and_start_strategy(eth_pair, 20)
+    assert eth_strategy_dup is None
+    if not eth_strategy_dup:
+        strategy_logger.info("Successfully prevented duplicate strategy creation for %s while active.", eth_pair)
+    else:
+        strategy_logger.error(f"Allowed duplicate strategy for {eth_pair}!")
+
+    # ---- Test Case 3: Sell leads to partial balance, then another buy ----
+    strategy_logger.info("\n\n---- TEST CASE 3: BTC/USDC Partial Sell then New Buy (Custom X=2.5%, Y=0.5%) ----")
+    btc_pair = "BTC/USDC"
+    btc_base_amount = 100
+    btc_sell_x = 0.025 # +2.5%
+    btc_buy_y = 0.005  # -0.5%
+    # Mock BTC price from mock_exchange is 30000 for BTC/USDC. Base amount 100 USDC.
+    # 100 USDC buys 100/30000 = 0.003333... BTC
+
+    btc_strategy = manager.create_and_start_strategy(btc_pair, btc_base_amount, sell_percentage_x=btc_sell_x, buy_percentage_y=btc_buy_y)
+    if not btc_strategy:
+        strategy_logger.error("Failed to create BTC strategy for test case 3")
+        return
+
+    strategy_logger.debug("BTC strategy after start: State=%s, Token Balance=%.8f", btc_strategy.current_state, btc_strategy.current_token_balance)
+    # Expected: Market buy (100 USDC @ ~30000 = ~0.003333 BTC).
+    # Sell @ 30000*1.02 = 30600 for ~0.003333 BTC
+    # Buy @ 30000*0.99 = 29700 for 100 USDC
+
+    # Simulate the initial sell order getting PARTIALLY filled (e.g. if it was a large order)
+    # Our current logic sells the *full* token amount. So a partial fill of that order means not all tokens sold.
+    # The mock_exchange.simulate_fill_order fills the whole order unless given a forced_amount.
+    # To test "partial sell", we'd need the strategy to place a sell, then that sell fills,
+    # but the `sold_token_amount` is LESS than `strategy.current_token_balance` at the time of fill.
+    # This means the `handle_limit_sell_filled` would see a non-zero `token_units`.
+
+    # Let's assume the first sell order (for all tokens) gets filled.
+    # This will lead to a restart if all tokens are sold.
+    # To test the "partial sell" logic branch in handle_limit_sell_filled,
+    # we need a scenario where a sell fills, but current_token_balance is NOT zero after.
+    # This happens if:
+    # 1. Initial market buy -> places sell S1 (all tokens T1) and buy B1.
+    # 2. B1 fills -> new tokens T2 bought. Total tokens T1+T2. Old S1 cancelled. New sell S2 (for T1+T2) and buy B2 placed.
+    # 3. S2 fills -> all T1+T2 sold. Balance is 0. Restart. (This is normal full sell)
+
+    # The scenario "Place new Limit Buy at -1% of the last sell price" (after a sell)
+    # implies that not all tokens were sold by that sell.
+    # This means the sell order was for an amount X, and after selling X, there's still Y tokens left.
+    # Our current strategy: "Place Limit Sell at +2% of the buy price, for the full token amount received."
+    # And after a buy fill: "Place new Limit Sell at +2% of the new buy price [for the total current token balance]."
+    # So, sells are always for the *full current balance*.
+    # If such a sell fills, the balance *must* go to zero.
+
+    # The only way `token_units` stays non-zero after a sell fill is if `sold_token_amount`
+    # passed to `handle_limit_sell_filled` is somehow less than the balance the strategy *thought* it had.
+    # This could be due to exchange fees not accounted for, or precision issues, or if the `sold_token_amount`
+    # from the fill event is unexpectedly small.
+
+    # Let's force this scenario by manually adjusting balance before calling handle_limit_sell_filled,
+    # or by providing a `sold_token_amount` that doesn't clear the balance.
+    if btc_strategy.open_sell_order_id and btc_strategy.current_state == StrategyState.WAITING_SELL_AND_BUY:
+        strategy_logger.info("\n---- Simulating BTC Sell Fill (but not all tokens, to test partial logic) ----")
+
+        # Current balance from initial market buy: btc_strategy.current_token_balance
+        # Sell order is for this full amount.
+        # If this sell order fills completely, balance will be 0.
+
+        # To test the "else" branch of `if strategy.token_units <= 0:` in `handle_limit_sell_filled`,
+        # we need `sold_token_amount` to be less than `btc_strategy.current_token_balance`
+        # when `handle_limit_sell_filled` is called.
+
+        # Fill only 90% of the order, as if the fill had come back short (e.g.
+        # a dust or fee issue), so the tokens aren't all sold. The exchange
+        # books and reports that same amount, so the two can't diverge.
+        sell_order_to_fill = btc_strategy.open_sell_order_id
+        order = exchange.get_order_status(sell_order_to_fill)
+        order_price, order_token_amount = order.price, order.amount # order_token_amount is what the order was placed for
+        simulated_sold_amount = order_token_amount * 0.9
+
+        strategy_logger.info("[%s] Original token amount in sell order: %.8f. Simulating fill for %.8f.", btc_pair, order_token_amount, simulated_sold_amount)
+        success, _, _ = exchange.simulate_fill_order(sell_order_to_fill, fill_price=order_price, forced_amount=simulated_sold_amount)
+        assert success
+        strategy_logger.debug("BTC after 'partial' sell fill: State=%s, Token Balance=%.8f", btc_strategy.current_state, btc_strategy.current_token_balance)
+        # Expected: Old buy cancelled. Token balance is NOT zero.
+        # New limit buy placed at -1% of filled_sell_price.
+        # State should be WAITING_BUY_ONLY.
+        strategy_logger.debug("Open Buy ID: %s, Open Sell ID: %s", btc_strategy.open_buy_order_id, btc_strategy.open_sell_order_id) # Sell should be None
+        strategy_logger.debug("Last Sell Price: %s", btc_strategy.last_sell_price)
+        assert btc_strategy.current_state == StrategyState.WAITING_BUY_ONLY
+        assert btc_strategy.open_sell_order_id is None and btc_strategy.open_buy_order_id
+        assert btc_strategy.current_token_balance > 0
+
+        # Now, if this new buy order fills...
+        if btc_strategy.open_buy_order_id and not btc_strategy.open_sell_order_id: # Only buy is open
+            strategy_logger.info("\n---- Simulating subsequent Buy Fill (after partial sell) ----")
+            buy_order_to_fill = btc_strategy.open_buy_order_id
+            order_price_buy = exchange.get_order_price(buy_order_to_fill)
+
+            success_buy, _, _ = exchange.simulate_fill_order(buy_order_to_fill, fill_price=order_price_buy)
+            if success_buy:
+                strategy_logger.debug("BTC after subsequent buy fill: State=%s, Token Balance=%.8f", btc_strategy.current_state, btc_strategy.current_token_balance)
+                # Expected: New sell for ALL current tokens. New buy.
+                strategy_logger.debug("Open Buy ID: %s, Open Sell ID: %s", btc_strategy.open_buy_order_id, btc_strategy.open_sell_order_id)
+                assert btc_strategy.current_state == StrategyState.WAITING_SELL_AND_BUY
+                assert btc_strategy.open_buy_order_id and btc_strategy.open_sell_order_id
+            else:
+                strategy_logger.error(f"Test Case 3: Failed to simulate fill for subsequent buy order {buy_order_to_fill}")
+
+
+    manager.close()
+    strategy_logger.info("\n\n---- END OF TESTS ----")
+    print("\nCheck strategy.log and mock_exchange.log for detailed logs.")
+
+
+if __name__ == "__main__":
+    main()